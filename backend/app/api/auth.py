@@ -6,7 +6,9 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from datetime import timedelta, datetime, timezone
 import logging
 
-from app.models.database import User, Conversation, Message, Feedback
+from pymongo.errors import DuplicateKeyError
+
+from app.models.database import User, UserAuthView, Conversation, Message, Feedback
 from app.models.schemas import (
     UserCreate, UserLogin, Token, UserResponse,
     UserProfileResponse, UserUpdate, ChangePasswordRequest
@@ -15,8 +17,11 @@ from app.core.auth import (
     get_password_hash,
     verify_password,
     create_access_token,
-    get_current_active_user
+    get_current_active_user,
+    get_current_user_document,
+    run_kdf,
 )
+from app.core.auth_cache import verify_user_password, invalidate_user
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -28,17 +33,17 @@ router = APIRouter()
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate):
     """Register a new user."""
-    existing_user = await User.find_one(User.email == user_data.email)
-    if existing_user:
+    hashed_password = await run_kdf(get_password_hash, user_data.password)
+    user = User(email=user_data.email, hashed_password=hashed_password)
+    # The unique email index rejects duplicates atomically — no pre-check race
+    try:
+        await user.insert()
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-
-    hashed_password = get_password_hash(user_data.password)
-    user = User(email=user_data.email, hashed_password=hashed_password)
-    await user.insert()
-    logger.info(f"New user registered: {user.email}")
+    logger.info("New user registered: %s", user.email)
 
     return UserResponse(
         user_id=user.user_id,
@@ -55,7 +60,7 @@ async def login(user_data: UserLogin):
     """Login and receive access token."""
     user = await User.find_one(User.email == user_data.email)
 
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await verify_user_password(user, user_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -73,14 +78,14 @@ async def login(user_data: UserLogin):
         data={"sub": user.email},
         expires_delta=access_token_expires
     )
-    logger.info(f"User logged in: {user.email}")
+    logger.info("User logged in: %s", user.email)
     return Token(access_token=access_token, token_type="bearer")
 
 
 # ── READ ──────────────────────────────────────────────────────────────────────
 
 @router.get("/me", response_model=UserProfileResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_document)):
     """Get current user's full profile."""
     return UserProfileResponse(
         user_id=current_user.user_id,
@@ -100,7 +105,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_active_
 @router.put("/me", response_model=UserProfileResponse)
 async def update_profile(
     data: UserUpdate,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_document)
 ):
     """Update full_name, bio, and/or avatar_color."""
     update_fields: dict = {}
@@ -122,7 +127,7 @@ async def update_profile(
     await current_user.update({"$set": update_fields})
     await current_user.sync()
 
-    logger.info(f"Profile updated for: {current_user.email}")
+    logger.info("Profile updated for: %s", current_user.email)
     return UserProfileResponse(
         user_id=current_user.user_id,
         email=current_user.email,
@@ -146,7 +151,7 @@ async def admin_login(user_data: UserLogin):
     """
     user = await User.find_one(User.email == user_data.email)
 
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await verify_user_password(user, user_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -170,7 +175,7 @@ async def admin_login(user_data: UserLogin):
         data={"sub": user.email},
         expires_delta=access_token_expires,
     )
-    logger.info(f"Admin logged in: {user.email}")
+    logger.info("Admin logged in: %s", user.email)
     return Token(access_token=access_token, token_type="bearer")
 
 
@@ -179,7 +184,7 @@ async def admin_login(user_data: UserLogin):
 @router.post("/promote", status_code=status.HTTP_200_OK)
 async def promote_to_admin(
     email: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserAuthView = Depends(get_current_active_user),
 ):
     """
     Grant admin rights to a user by email.
@@ -194,7 +199,7 @@ async def promote_to_admin(
     if not target:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     await target.update({"$set": {"is_admin": True}})
-    logger.info(f"{current_user.email} promoted {email} to admin")
+    logger.info("%s promoted %s to admin", current_user.email, email)
     return {"message": f"{email} is now an admin"}
 
 
@@ -203,49 +208,41 @@ async def promote_to_admin(
 @router.put("/me/password", status_code=status.HTTP_200_OK)
 async def change_password(
     data: ChangePasswordRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_document)
 ):
     """Change the authenticated user's password."""
-    if not verify_password(data.current_password, current_user.hashed_password):
+    if not await run_kdf(verify_password, data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
 
-    new_hash = get_password_hash(data.new_password)
+    new_hash = await run_kdf(get_password_hash, data.new_password)
     await current_user.update({
         "$set": {
             "hashed_password": new_hash,
             "updated_at": datetime.now(timezone.utc)
         }
     })
-    logger.info(f"Password changed for: {current_user.email}")
+    await invalidate_user(current_user.user_id)
+    logger.info("Password changed for: %s", current_user.email)
     return {"message": "Password updated successfully"}
 
 
 # ── DELETE account ────────────────────────────────────────────────────────────
 
 @router.delete("/me", status_code=status.HTTP_200_OK)
-async def delete_account(current_user: User = Depends(get_current_active_user)):
+async def delete_account(current_user: User = Depends(get_current_user_document)):
     """
     Permanently delete the authenticated user's account.
     Cascades to conversations, messages and feedback owned by the user.
     """
-    conversations = await Conversation.find(
-        Conversation.user.id == current_user.id  # type: ignore[attr-defined]
-    ).to_list()
-
-    for conv in conversations:
-        messages = await Message.find(
-            Message.conversation.id == conv.id  # type: ignore[attr-defined]
-        ).to_list()
-        for msg in messages:
-            await Feedback.find(
-                Feedback.message.id == msg.id  # type: ignore[attr-defined]
-            ).delete()
-            await msg.delete()
-        await conv.delete()
+    # Owner-scoped bulk deletes via the denormalised user_id
+    await Feedback.find(Feedback.user_id == current_user.user_id).delete()
+    await Message.find(Message.user_id == current_user.user_id).delete()
+    await Conversation.find(Conversation.user_id == current_user.user_id).delete()
 
     await current_user.delete()
-    logger.info(f"Account deleted: {current_user.email}")
+    await invalidate_user(current_user.user_id)
+    logger.info("Account deleted: %s", current_user.email)
     return {"message": "Account deleted successfully"}
@@ -2,14 +2,22 @@
 Chat API endpoints for conversational troubleshooting.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from datetime import datetime, timezone
+from typing import Optional
+import asyncio
 import logging
 
-from app.models.database import User, Conversation, Message, MessageRole
-from app.models.schemas import ChatRequest, ChatResponse, SourceCitation, ConversationHistoryResponse, MessageResponse, ConversationResponse
+from beanie import PydanticObjectId
+from pymongo import DESCENDING
+
+from app.models.database import User, UserAuthView, Conversation, Message, MessageRole, ConversationSummary, MessageView
+from app.models.schemas import ChatRequest, ChatResponse, SourceCitation, ConversationHistoryResponse, ConversationResponse
 from app.core.auth import get_current_active_user
 from app.services.rag_service import rag_service
+from app.services.answer_cache import answer_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -18,7 +26,7 @@ router = APIRouter()
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user)
 ):
     """
     Handle chat requests with RAG-based responses.
@@ -35,57 +43,79 @@ async def chat(
         is_new_conversation = not bool(request.conversation_id)
         if request.conversation_id:
             conversation = await Conversation.find_one(
-                {"conversation_id": request.conversation_id}
+                {
+                    "conversation_id": request.conversation_id,
+                    "user_id": current_user.user_id,
+                }
             )
             if not conversation:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Conversation not found"
                 )
-            # Update conversation timestamp
-            conversation.updated_at = datetime.now(timezone.utc)
-            await conversation.save()
         else:
             # Create new conversation
             conversation = Conversation(
-                user=current_user,
+                user=User.link_from_id(current_user.id),
+                user_id=current_user.user_id,
                 device_type=request.device_type,
                 brand=request.brand,
                 model=request.model
             )
             await conversation.insert()
         
-        # Save user message
         user_message = Message(
             conversation=conversation,
+            user_id=current_user.user_id,
             role=MessageRole.USER,
             content=request.query
         )
-        await user_message.insert()
         
-        # Generate answer using RAG
-        logger.info(f"Processing query: {request.query[:50]}...")
-        result = await rag_service.generate_answer(
-            query=request.query,
-            device_type=request.device_type,
-            brand=request.brand,
-            model=request.model,
-            ai_model=request.ai_model or "gemini",
-        )
+        # Generate answer using RAG, consulting the answer cache first
+        logger.info("Processing query: %s...", request.query[:50])
+        ai_model = request.ai_model or "gemini"
+        scope = (request.device_type, request.brand, request.model)
+        cache_key = answer_cache.make_key(request.query, scope, ai_model)
+
+        result = answer_cache.get_exact(cache_key)
+        if result is None:
+            # The RAG call takes hundreds of ms, so hide the user-message
+            # write behind it; if either fails the other is cancelled.
+            result, _ = await _run_together(
+                _generate_uncached(request, scope, ai_model, cache_key),
+                user_message.insert(),
+            )
+            pending_messages = []
+        else:
+            logger.info("Answer served from cache")
+            # Nothing slow to overlap with — write both turns together below
+            pending_messages = [user_message]
         
-        # Format sources
+        # rag_service already returns plain dicts with the SourceCitation
+        # fields, so store them as-is and build the response models
+        # without a second validation pass.
         sources = [
-            SourceCitation(**source) for source in result["sources"]
+            SourceCitation.model_construct(**source) for source in result["sources"]
         ]
         
         # Save assistant message
         assistant_message = Message(
             conversation=conversation,
+            user_id=current_user.user_id,
             role=MessageRole.ASSISTANT,
             content=result["answer"],
-            sources=[source.dict() for source in sources]
+            sources=result["sources"]
         )
-        await assistant_message.insert()
+
+        # Persist the remaining turn(s) in one write, overlapping the
+        # conversation timestamp bump for existing conversations.
+        pending_messages.append(assistant_message)
+        writes = [Message.insert_many(pending_messages)]
+        if not is_new_conversation:
+            writes.append(
+                conversation.update({"$set": {"updated_at": datetime.now(timezone.utc)}})
+            )
+        await _run_together(*writes)
 
         # Generate an LLM title for brand-new conversations
         generated_title: str | None = None
@@ -93,15 +123,15 @@ async def chat(
             try:
                 generated_title = await rag_service.generate_title(
                     first_message=request.query,
-                    ai_model=request.ai_model or "gemini",
+                    ai_model=ai_model,
                 )
                 conversation.title = generated_title
                 await conversation.save()
-                logger.info(f"Title set for conversation {conversation.conversation_id}: {generated_title}")
+                logger.info("Title set for conversation %s: %s", conversation.conversation_id, generated_title)
             except Exception as title_err:
-                logger.warning(f"Could not generate title: {title_err}")
+                logger.warning("Could not generate title: %s", title_err)
         
-        logger.info(f"Generated response for conversation {conversation.conversation_id}")
+        logger.info("Generated response for conversation %s", conversation.conversation_id)
         
         return ChatResponse(
             answer=result["answer"],
@@ -113,33 +143,109 @@ async def chat(
         )
         
     except Exception as e:
-        logger.error(f"Error processing chat request: {e}")
+        logger.error("Error processing chat request: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing request: {str(e)}"
         )
 
 
-@router.get("/conversation/{conversation_id}", response_model=ConversationHistoryResponse)
+async def _run_together(*coros) -> list:
+    """
+    Await coroutines concurrently and return their results in order.
+
+    Runs them in a TaskGroup, so when one fails the others are cancelled
+    rather than left running detached, then re-raises that first error
+    itself instead of the ExceptionGroup wrapping it.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(coro) for coro in coros]
+    except ExceptionGroup as errors:
+        raise errors.exceptions[0]
+    return [task.result() for task in tasks]
+
+
+async def _generate_uncached(request: ChatRequest, scope: tuple, ai_model: str, cache_key: str) -> dict:
+    """Answer a query that missed the exact cache: semantic probe, then full RAG."""
+    try:
+        query_embedding = await rag_service.embed_query(request.query)
+    except Exception as e:
+        # Embedding model not loaded or TEI unreachable: skip the semantic
+        # cache and let generate_answer fall back as it always has
+        logger.warning("Query embedding failed, skipping semantic cache: %s", e)
+        query_embedding = None
+
+    if query_embedding is not None:
+        result = answer_cache.get_semantic(query_embedding, scope, ai_model)
+        if result is not None:
+            return result
+
+    result = await rag_service.generate_answer(
+        query=request.query,
+        device_type=request.device_type,
+        brand=request.brand,
+        model=request.model,
+        ai_model=ai_model,
+        query_embedding=query_embedding,
+    )
+    # Only cache grounded answers — an empty retrieval is more
+    # likely to change once new manuals are indexed.
+    if result["sources"]:
+        answer_cache.put(cache_key, scope, ai_model, result, query_embedding)
+    return result
+
+
+@router.get(
+    "/conversation/{conversation_id}",
+    response_model=None,
+    responses={200: {"model": ConversationHistoryResponse}},
+)
 async def get_conversation_history(
     conversation_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user),
+    limit: int = Query(default=200, ge=1, le=1000),
+    before: Optional[datetime] = None,
+    before_id: Optional[PydanticObjectId] = None,
 ):
     """
     Get conversation history.
     
+    Messages are paged backwards from the newest: the first call returns
+    the latest ``limit`` messages, and ``next_cursor`` (when set) is passed
+    back as ``before`` (with ``next_cursor_id`` as ``before_id``) to load
+    the page preceding them. Messages written together can share a
+    millisecond timestamp, so the cursor is (created_at, _id).
+    
     Args:
         conversation_id: Conversation ID
         current_user: Authenticated user
+        limit: Maximum number of messages to return
+        before: Only return messages created before this timestamp
+        before_id: Message _id at the ``before`` timestamp; older ties at the
+            same timestamp are included. Only valid together with ``before``.
         
     Returns:
-        Conversation details with all messages
+        Conversation details with a page of messages in chronological order
     """
-    # Find conversation AND verify ownership in one query — avoids fetch_link Motor incompatibility
+    # A lone before_id would otherwise be ignored and return the first page
+    if before_id is not None and before is None:
+        raise RequestValidationError(
+            [
+                {
+                    "type": "missing",
+                    "loc": ("query", "before"),
+                    "msg": "before is required when before_id is given",
+                    "input": None,
+                }
+            ]
+        )
+
+    # Find conversation AND verify ownership in one indexed query
     conversation = await Conversation.find_one(
         {
             "conversation_id": conversation_id,
-            "user.$id": current_user.id
+            "user_id": current_user.user_id
         }
     )
 
@@ -149,40 +255,67 @@ async def get_conversation_history(
             detail="Conversation not found or not authorized"
         )
 
-    # Get all messages for this conversation
-    messages = await Message.find(
-        {"conversation.$id": conversation.id}
-    ).sort("+created_at").to_list()
-
-    # Format response
-    message_responses = [
-        MessageResponse(
-            message_id=msg.message_id,
-            role=msg.role.value,
-            content=msg.content,
-            sources=[SourceCitation(**s) for s in (msg.sources or [])],
-            created_at=msg.created_at
-        )
-        for msg in messages
-    ]
-
-    return ConversationHistoryResponse(
-        conversation=ConversationResponse(
-            conversation_id=conversation.conversation_id,
-            device_type=conversation.device_type,
-            brand=conversation.brand,
-            model=conversation.model,
-            created_at=conversation.created_at,
-            updated_at=conversation.updated_at,
-            message_count=len(messages)
-        ),
-        messages=message_responses
+    # Range scan on the (conversation.$id, created_at, _id) index — one
+    # extra row tells us whether an older page exists.
+    message_filter = {"conversation.$id": conversation.id}
+    if before is not None and before_id is not None:
+        message_filter["$or"] = [
+            {"created_at": {"$lt": before}},
+            {"created_at": before, "_id": {"$lt": before_id}},
+        ]
+    elif before is not None:
+        message_filter["created_at"] = {"$lt": before}
+    page = await (
+        Message.find(message_filter)
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(limit + 1)
+        .project(MessageView)
+        .to_list()
     )
 
+    has_more = len(page) > limit
+    messages = page[:limit][::-1]
+    next_cursor = messages[0].created_at if has_more else None
+    next_cursor_id = str(messages[0].id) if has_more else None
+
+    # A short first page is the whole thread; otherwise count separately
+    if before is None and not has_more:
+        message_count = len(messages)
+    else:
+        message_count = await Message.find({"conversation.$id": conversation.id}).count()
+
+    # Serialise straight from the projection rows: the data was written by
+    # this API, so FastAPI's second validation pass over every message and
+    # citation is skipped. response_model stays in `responses` for the docs.
+    return ORJSONResponse(content={
+        "conversation": {
+            "conversation_id": conversation.conversation_id,
+            "title": conversation.title,
+            "device_type": conversation.device_type,
+            "brand": conversation.brand,
+            "model": conversation.model,
+            "created_at": conversation.created_at,
+            "updated_at": conversation.updated_at,
+            "message_count": message_count,
+        },
+        "messages": [
+            {
+                "message_id": msg.message_id,
+                "role": msg.role.value,
+                "content": msg.content,
+                "sources": msg.sources or [],
+                "created_at": msg.created_at,
+            }
+            for msg in messages
+        ],
+        "next_cursor": next_cursor,
+        "next_cursor_id": next_cursor_id,
+    })
+
 
 @router.get("/conversations", response_model=list[ConversationResponse])
 async def list_conversations(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserAuthView = Depends(get_current_active_user),
     limit: int = 20,
     skip: int = 0
 ):
@@ -197,38 +330,38 @@ async def list_conversations(
     Returns:
         List of conversations
     """
-    # Use reliable dict-based filter for Link references
     conversations = await Conversation.find(
-        {"user.$id": current_user.id}
-    ).sort("-updated_at").skip(skip).limit(limit).to_list()
+        {"user_id": current_user.user_id}
+    ).sort("-updated_at").skip(skip).limit(limit).project(ConversationSummary).to_list()
     
-    # Get message counts
-    responses = []
-    for conv in conversations:
-        message_count = await Message.find(
-            {"conversation.$id": conv.id}
-        ).count()
-        
-        responses.append(
-            ConversationResponse(
-                conversation_id=conv.conversation_id,
-                title=conv.title,
-                device_type=conv.device_type,
-                brand=conv.brand,
-                model=conv.model,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                message_count=message_count
-            )
+    # Get message counts for the whole page in one aggregation
+    message_counts = {}
+    if conversations:
+        counts = await Message.aggregate([
+            {"$match": {"conversation.$id": {"$in": [conv.id for conv in conversations]}}},
+            {"$group": {"_id": "$conversation.$id", "n": {"$sum": 1}}},
+        ]).to_list()
+        message_counts = {row["_id"]: row["n"] for row in counts}
+
+    return [
+        ConversationResponse(
+            conversation_id=conv.conversation_id,
+            title=conv.title,
+            device_type=conv.device_type,
+            brand=conv.brand,
+            model=conv.model,
+            created_at=conv.created_at,
+            updated_at=conv.updated_at,
+            message_count=message_counts.get(conv.id, 0)
         )
-    
-    return responses
+        for conv in conversations
+    ]
 
 
 @router.delete("/conversation/{conversation_id}", status_code=status.HTTP_200_OK)
 async def delete_conversation(
     conversation_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user)
 ):
     """
     Delete a conversation and all its messages.
@@ -243,7 +376,7 @@ async def delete_conversation(
     conversation = await Conversation.find_one(
         {
             "conversation_id": conversation_id,
-            "user.$id": current_user.id,
+            "user_id": current_user.user_id,
         }
     )
 
@@ -254,10 +387,8 @@ async def delete_conversation(
         )
 
     # Delete all messages in this conversation first
-    messages = await Message.find({"conversation.$id": conversation.id}).to_list()
-    for msg in messages:
-        await msg.delete()
+    await Message.find({"conversation.$id": conversation.id}).delete()
 
     await conversation.delete()
-    logger.info(f"Conversation {conversation_id} deleted by {current_user.email}")
+    logger.info("Conversation %s deleted by %s", conversation_id, current_user.email)
     return {"message": "Conversation deleted successfully"}
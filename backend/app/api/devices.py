@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 import asyncio
 import logging
+import time
 
 from app.models.database import ManualDocument, DocumentStatus
 from app.models.schemas import DeviceListResponse, DeviceInfo
@@ -14,6 +15,16 @@ from app.core.auth import get_current_active_user
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# The device list is identical for every user and only changes when a
+# document is indexed or deleted, so a process-wide cache is safe.
+_DEVICE_CACHE_TTL_SECONDS = 60
+_device_catalog_cache = {"at": 0.0, "data": None}
+
+
+def invalidate_device_cache() -> None:
+    """Force the next /devices call to rebuild the catalog."""
+    _device_catalog_cache["at"] = 0.0
+
 
 @router.get("/devices", response_model=DeviceListResponse)
 async def list_devices():
@@ -24,16 +35,15 @@ async def list_devices():
     collection (indexed documents only), so the dropdown is always in sync with
     what has actually been indexed — no separate catalog sync required.
     """
+    cached = _device_catalog_cache["data"]
+    if cached is not None and time.monotonic() - _device_catalog_cache["at"] < _DEVICE_CACHE_TTL_SECONDS:
+        return cached
+
     try:
-        # Include INDEXED docs AND partially-uploaded FAILED docs
-        # (a failed doc may still have many chunks in Qdrant)
+        # INDEXED docs only: a failed run deletes the vectors it wrote, so a
+        # FAILED doc has no searchable chunks of its own to offer
         docs = await ManualDocument.find(
-            {
-                "$or": [
-                    {"status": DocumentStatus.INDEXED},
-                    {"status": DocumentStatus.FAILED, "chunks_count": {"$gt": 0}},
-                ]
-            }
+            ManualDocument.status == DocumentStatus.INDEXED,
         ).to_list()
 
         # Aggregate into  { device_type -> { brand -> {model, ...} } }
@@ -61,11 +71,14 @@ async def list_devices():
             for dt in sorted(catalog.keys())
         ]
 
-        logger.info(f"Returning {len(devices)} device type(s) from indexed documents")
-        return DeviceListResponse(devices=devices, total_count=len(devices))
+        logger.info("Returning %s device type(s) from indexed documents", len(devices))
+        response = DeviceListResponse(devices=devices, total_count=len(devices))
+        _device_catalog_cache["data"] = response
+        _device_catalog_cache["at"] = time.monotonic()
+        return response
 
     except Exception as e:
-        logger.error(f"Error listing devices: {e}")
+        logger.error("Error listing devices: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving device list",
@@ -2,26 +2,40 @@
 Document upload and management API endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
 from typing import List
+import hashlib
 import os
 import logging
 from datetime import datetime, timezone
 
-from app.models.database import User, ManualDocument, DocumentStatus, DeviceCategory
+import aiofiles
+
+from app.models.database import User, UserAuthView, ManualDocument, DocumentStatus, DeviceCategory, new_id
 from app.models.schemas import DocumentUploadResponse, DocumentListResponse, DocumentMetadata
 from app.core.auth import get_current_active_user
 from app.core.config import settings
 from app.services.document_processor import process_document_task
+from app.services.answer_cache import answer_cache
+from app.api.devices import invalidate_device_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Read uploads from the client in 1 MiB chunks
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Fields returned by GET /documents, straight from MongoDB
+_DOCUMENT_LIST_PROJECTION = {"_id": 0, **{field: 1 for field in DocumentListResponse.model_fields}}
+
+# Allowed upload extensions, normalised once for O(1) membership checks
+_ALLOWED_EXTENSIONS = frozenset(ext.lower() for ext in settings.allowed_extensions_list)
+
 
 def validate_file_extension(filename: str) -> bool:
     """Check if file extension is allowed."""
-    ext = filename.split('.')[-1].lower()
-    return ext in settings.allowed_extensions_list
+    return os.path.splitext(filename)[1][1:].lower() in _ALLOWED_EXTENSIONS
 
 
 def validate_file_size(file_size: int) -> bool:
@@ -39,59 +53,90 @@ async def update_device_catalog(device_type: str, brand: str, model: str = None)
         model: Optional device model
     """
     try:
-        # Find or create device category
-        category = await DeviceCategory.find_one(DeviceCategory.name == device_type)
-        
-        if not category:
-            # Create new category
-            category = DeviceCategory(
-                name=device_type,
-                brands=[brand],
-                models={brand: [model] if model else []}
-            )
-            await category.insert()
-            logger.info(f"Created new device category: {device_type}")
-        else:
-            # Update existing category
-            updated = False
-            
-            # Add brand if not exists
-            if brand not in category.brands:
-                category.brands.append(brand)
-                updated = True
-            
-            # Add model if provided
-            if model:
-                if brand not in category.models:
-                    category.models[brand] = [model]
-                    updated = True
-                elif model not in category.models[brand]:
-                    category.models[brand].append(model)
-                    updated = True
-            
-            if updated:
-                category.updated_at = datetime.now(timezone.utc)
-                await category.save()
-                logger.info(f"Updated device category: {device_type}")
+        # Single atomic upsert, so concurrent uploads can't overwrite each
+        # other's additions. An update pipeline rather than a
+        # "models.<brand>" path: $getField/$setField take the brand as a
+        # literal key, so brands containing "." or starting with "$" stay
+        # plain dict keys (MongoDB 5.0+). $literal also keeps "$"-prefixed
+        # brand/model values from being read as field paths. A brand with
+        # no model still gets an empty model list.
+        now = datetime.now(timezone.utc)
+        brand_key = {"$literal": brand}
+        brands = {"$ifNull": ["$brands", []]}
+        models = {"$ifNull": ["$models", {}]}
+        brand_models = {"$ifNull": [{"$getField": {"field": brand_key, "input": models}}, []]}
+        if model:
+            brand_models = {"$cond": [
+                {"$in": [{"$literal": model}, brand_models]},
+                brand_models,
+                {"$concatArrays": [brand_models, [{"$literal": model}]]},
+            ]}
+        await DeviceCategory.find_one(DeviceCategory.name == device_type).update(
+            [
+                {
+                    "$set": {
+                        "brands": {"$cond": [
+                            {"$in": [brand_key, brands]},
+                            brands,
+                            {"$concatArrays": [brands, [brand_key]]},
+                        ]},
+                        "models": {"$setField": {"field": brand_key, "input": models, "value": brand_models}},
+                        "category_id": {"$ifNull": ["$category_id", new_id()]},
+                        "created_at": {"$ifNull": ["$created_at", now]},
+                        "updated_at": now,
+                    }
+                }
+            ],
+            upsert=True,
+        )
+        logger.info("Device catalog updated: %s / %s / %s", device_type, brand, model or '-')
     
     except Exception as e:
-        logger.error(f"Error updating device catalog: {e}")
+        logger.error("Error updating device catalog: %s", e)
         # Don't fail the upload if catalog update fails
+    
+    finally:
+        # /devices is built from indexed documents, so it is stale either way
+        invalidate_device_cache()
+
+
 
+async def _process_and_update_catalog(document_id, device_type: str, brand: str, model: str = None):
+    """
+    Background task: index an uploaded document, then refresh the catalog.
+    
+    Args:
+        document_id: MongoDB id of the ManualDocument to process
+        device_type: Type of device
+        brand: Device brand
+        model: Optional device model
+    """
+    try:
+        success = await process_document_task(document_id)
+        
+        # Update device catalog if processing was successful
+        if success:
+            await update_device_catalog(device_type, brand, model)
+            answer_cache.invalidate(device_type, brand, model)
+    except Exception as e:
+        logger.error("Error processing document %s in background: %s", document_id, e)
+        # Document will remain in PENDING/FAILED status
 
 
 @router.post("/upload-manual", response_model=DocumentUploadResponse)
 async def upload_manual(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     device_type: str = Form(...),
     brand: str = Form(...),
     model: str = Form(None),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user)
 ):
     """
     Upload a device manual for processing.
     
     Args:
+        background_tasks: Runs document processing after the response is sent
         file: PDF/text file to upload
         device_type: Type of device (e.g., Refrigerator, Washing Machine)
         brand: Device brand (e.g., Samsung, LG)
@@ -121,17 +166,6 @@ async def upload_manual(
                 detail=f"File type not allowed. Allowed types: {', '.join(settings.allowed_extensions_list)}"
             )
         
-        # Read file
-        contents = await file.read()
-        file_size = len(contents)
-        
-        # Validate file size
-        if not validate_file_size(file_size):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size: {settings.max_upload_size_mb}MB"
-            )
-        
         # Create upload directory if it doesn't exist
         os.makedirs(settings.upload_dir, exist_ok=True)
         
@@ -140,9 +174,70 @@ async def upload_manual(
         safe_filename = f"{device_type}_{brand}_{timestamp}_{file.filename}"
         file_path = os.path.join(settings.upload_dir, safe_filename)
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        # Stream file to disk in chunks, tracking size and content hash
+        # as we go so the whole upload is never held in memory.
+        file_size = 0
+        digest = hashlib.sha256()
+        try:
+            async with aiofiles.open(file_path, "wb") as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if not validate_file_size(file_size):
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File too large. Maximum size: {settings.max_upload_size_mb}MB"
+                        )
+                    digest.update(chunk)
+                    await out.write(chunk)
+        except BaseException:
+            # Don't leave partial uploads behind
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        content_hash = digest.hexdigest()
+        
+        # Identical file already indexed for the same device? Reuse its
+        # chunks instead of re-running extraction and embedding.
+        duplicate_of = await ManualDocument.find_one(
+            ManualDocument.content_hash == content_hash,
+            ManualDocument.device_type == device_type,
+            ManualDocument.brand == brand,
+            ManualDocument.model == model,
+            ManualDocument.status == DocumentStatus.INDEXED,
+        )
+        if duplicate_of:
+            document = ManualDocument(
+                filename=file.filename,
+                device_type=device_type,
+                brand=brand,
+                model=model,
+                file_path=file_path,
+                file_size=file_size,
+                content_hash=content_hash,
+                status=DocumentStatus.INDEXED,
+                chunks_count=duplicate_of.chunks_count,
+                vectors_document_id=duplicate_of.vectors_document_id or duplicate_of.document_id,
+                processed_at=datetime.now(timezone.utc),
+                uploaded_by=User.link_from_id(current_user.id),
+                user_id=current_user.user_id
+            )
+            await document.insert()
+            await update_device_catalog(device_type, brand, model)
+            
+            logger.info(
+                "Document uploaded: %s (duplicate of %s, reusing chunks)",
+                document.document_id, document.vectors_document_id,
+            )
+            
+            return DocumentUploadResponse(
+                document_id=document.document_id,
+                filename=file.filename,
+                device_type=device_type,
+                brand=brand,
+                model=model,
+                status=document.status.value,
+                message="Identical manual already indexed — reusing existing chunks"
+            )
         
         # Create document record
         document = ManualDocument(
@@ -152,26 +247,20 @@ async def upload_manual(
             model=model,
             file_path=file_path,
             file_size=file_size,
+            content_hash=content_hash,
             status=DocumentStatus.PENDING,
-            uploaded_by=current_user
+            uploaded_by=User.link_from_id(current_user.id),
+            user_id=current_user.user_id
         )
         await document.insert()
         
-        # Queue document for processing (async task)
-        # This would typically use Celery, but for now we'll process synchronously
-        try:
-            from app.services.document_processor import DocumentProcessor
-            processor = DocumentProcessor()
-            success = await processor.process_document(document.id)
-            
-            # Update device catalog if processing was successful
-            if success:
-                await update_device_catalog(device_type, brand, model)
-        except Exception as e:
-            logger.error(f"Error queuing document for processing: {e}")
-            # Document will remain in PENDING status
+        # Queue document for processing once the response has been sent.
+        # Clients poll GET /documents/{document_id} for PENDING → PROCESSING → INDEXED.
+        background_tasks.add_task(
+            _process_and_update_catalog, document.id, device_type, brand, model
+        )
         
-        logger.info(f"Document uploaded: {document.document_id}")
+        logger.info("Document uploaded: %s", document.document_id)
         
         return DocumentUploadResponse(
             document_id=document.document_id,
@@ -186,16 +275,20 @@ async def upload_manual(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error uploading document: {e}")
+        logger.error("Error uploading document: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error uploading document: {str(e)}"
         )
 
 
-@router.get("/documents", response_model=List[DocumentListResponse])
+@router.get(
+    "/documents",
+    response_model=None,
+    responses={200: {"model": List[DocumentListResponse]}},
+)
 async def list_documents(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserAuthView = Depends(get_current_active_user),
     device_type: str = None,
     brand: str = None,
     status_filter: str = None,
@@ -217,46 +310,39 @@ async def list_documents(
         List of documents
     """
     # Build query
-    query = ManualDocument.uploaded_by.id == current_user.id
+    mongo_filter = {"user_id": current_user.user_id}
     
     if device_type:
-        query = query & (ManualDocument.device_type == device_type)
+        mongo_filter["device_type"] = device_type
     if brand:
-        query = query & (ManualDocument.brand == brand)
+        mongo_filter["brand"] = brand
     if status_filter:
         try:
-            status_enum = DocumentStatus(status_filter)
-            query = query & (ManualDocument.status == status_enum)
+            mongo_filter["status"] = DocumentStatus(status_filter).value
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid status. Valid values: {[s.value for s in DocumentStatus]}"
             )
     
-    # Execute query
-    documents = await ManualDocument.find(query).sort("-uploaded_at").skip(skip).limit(limit).to_list()
+    # Execute as an aggregation so rows come back as plain dicts — no ODM
+    # hydration or Pydantic validation per document. The projection is
+    # exactly the DocumentListResponse fields.
+    rows = await ManualDocument.aggregate([
+        {"$match": mongo_filter},
+        {"$sort": {"uploaded_at": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": _DOCUMENT_LIST_PROJECTION},
+    ]).to_list()
     
-    # Format response
-    return [
-        DocumentListResponse(
-            document_id=doc.document_id,
-            filename=doc.filename,
-            device_type=doc.device_type,
-            brand=doc.brand,
-            model=doc.model,
-            status=doc.status.value,
-            chunks_count=doc.chunks_count,
-            uploaded_at=doc.uploaded_at,
-            processed_at=doc.processed_at
-        )
-        for doc in documents
-    ]
+    return ORJSONResponse(content=rows)
 
 
 @router.get("/documents/{document_id}", response_model=DocumentListResponse)
 async def get_document(
     document_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user)
 ):
     """
     Get document details.
@@ -268,8 +354,10 @@ async def get_document(
     Returns:
         Document details
     """
+    # Ownership is part of the filter: another user's document is a 404
     document = await ManualDocument.find_one(
-        ManualDocument.document_id == document_id
+        ManualDocument.document_id == document_id,
+        ManualDocument.user_id == current_user.user_id,
     )
     
     if not document:
@@ -278,13 +366,6 @@ async def get_document(
             detail="Document not found"
         )
     
-    # Verify ownership – compare raw Link ref id to avoid fetch_link aggregate bug
-    if document.uploaded_by.ref.id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this document"
-        )
-    
     return DocumentListResponse(
         document_id=document.document_id,
         filename=document.filename,
@@ -301,7 +382,7 @@ async def get_document(
 @router.delete("/documents/{document_id}")
 async def delete_document(
     document_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user)
 ):
     """
     Delete a document.
@@ -313,8 +394,10 @@ async def delete_document(
     Returns:
         Success message
     """
+    # Ownership is part of the filter: another user's document is a 404
     document = await ManualDocument.find_one(
-        ManualDocument.document_id == document_id
+        ManualDocument.document_id == document_id,
+        ManualDocument.user_id == current_user.user_id,
     )
     
     if not document:
@@ -323,31 +406,41 @@ async def delete_document(
             detail="Document not found"
         )
     
-    # Verify ownership – compare raw Link ref id to avoid fetch_link aggregate bug
-    if document.uploaded_by.ref.id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this document"
-        )
-    
     # Delete file from disk
     try:
         if os.path.exists(document.file_path):
             os.remove(document.file_path)
     except Exception as e:
-        logger.warning(f"Error deleting file: {e}")
+        logger.warning("Error deleting file: %s", e)
     
-    # Delete from vector store
-    try:
-        from app.services.rag_service import rag_service
-        rag_service.delete_document(document_id)
-    except Exception as e:
-        logger.warning(f"Error removing from vector store: {e}")
+    # Delete from vector store, unless the chunks are shared with another
+    # upload of the same file (content-hash dedup)
+    vectors_id = document.vectors_document_id or document.document_id
+    still_shared = await ManualDocument.find_one(
+        {
+            "_id": {"$ne": document.id},
+            "$or": [
+                {"document_id": vectors_id},
+                {"vectors_document_id": vectors_id},
+            ],
+        }
+    )
+    if still_shared:
+        logger.info("Keeping vectors %s: still used by %s", vectors_id, still_shared.document_id)
+    else:
+        try:
+            from app.services.rag_service import rag_service
+            rag_service.delete_document(vectors_id)
+        except Exception as e:
+            logger.warning("Error removing from vector store: %s", e)
+
+    answer_cache.invalidate(document.device_type, document.brand, document.model)
     
     # Delete document record
     await document.delete()
+    invalidate_device_cache()
     
-    logger.info(f"Document deleted: {document_id}")
+    logger.info("Document deleted: %s", document_id)
     
     return {"message": "Document deleted successfully"}
 
@@ -355,7 +448,7 @@ async def delete_document(
 @router.post("/documents/{document_id}/reindex")
 async def reindex_document(
     document_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserAuthView = Depends(get_current_active_user),
 ):
     """
     Re-process a FAILED document without re-uploading the file.
@@ -364,8 +457,10 @@ async def reindex_document(
     Resets the status to PENDING and re-runs the full embedding + indexing
     pipeline from the already-saved PDF on disk.
     """
+    # Ownership is part of the filter: another user's document is a 404
     document = await ManualDocument.find_one(
-        ManualDocument.document_id == document_id
+        ManualDocument.document_id == document_id,
+        ManualDocument.user_id == current_user.user_id,
     )
 
     if not document:
@@ -374,11 +469,15 @@ async def reindex_document(
             detail="Document not found",
         )
 
-    # Verify ownership – compare raw Link ref id to avoid fetch_link aggregate bug
-    if document.uploaded_by.ref.id != current_user.id:
+    # A deduplicated upload has no chunks of its own: it reads the original
+    # upload's vectors, so re-indexing it under its own id would orphan them
+    if document.vectors_document_id:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to reindex this document",
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                "Document reuses the chunks of an identical upload "
+                f"({document.vectors_document_id}) and cannot be re-indexed on its own."
+            ),
         )
 
     if not document.file_path or not os.path.exists(document.file_path):
@@ -395,11 +494,11 @@ async def reindex_document(
 
     # Re-process (same pipeline as upload)
     try:
-        from app.services.document_processor import DocumentProcessor
-        processor = DocumentProcessor()
-        success = await processor.process_document(document.id)
+        # Shares the MAX_CONCURRENT_DOCS limit with upload processing
+        success = await process_document_task(document.id)
 
         if success:
+            answer_cache.invalidate(document.device_type, document.brand, document.model)
             return {
                 "message": "Document re-indexed successfully",
                 "document_id": document_id,
@@ -413,7 +512,7 @@ async def reindex_document(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error re-indexing document {document_id}: {e}")
+        logger.error("Error re-indexing document %s: %s", document_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Re-indexing error: {str(e)}",
@@ -3,9 +3,13 @@ Feedback API endpoints.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timezone
 import logging
 
-from app.models.database import User, Message, Feedback as FeedbackModel
+from beanie import UpdateResponse
+from bson import DBRef
+
+from app.models.database import UserAuthView, Message, MessageKey, Feedback as FeedbackModel, new_id
 from app.models.schemas import FeedbackRequest, FeedbackResponse
 from app.core.auth import get_current_active_user
 
@@ -16,7 +20,7 @@ router = APIRouter()
 @router.post("/feedback", response_model=FeedbackResponse)
 async def submit_feedback(
     feedback_request: FeedbackRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserAuthView = Depends(get_current_active_user)
 ):
     """
     Submit feedback on an assistant message.
@@ -29,9 +33,12 @@ async def submit_feedback(
         Feedback confirmation
     """
     try:
-        # Find message
+        # Ownership is enforced by the match itself — a message owned by
+        # someone else is indistinguishable from a missing one (404).
         message = await Message.find_one(
-            Message.message_id == feedback_request.message_id
+            Message.message_id == feedback_request.message_id,
+            Message.user_id == current_user.user_id,
+            projection_model=MessageKey,
         )
         
         if not message:
@@ -40,53 +47,43 @@ async def submit_feedback(
                 detail="Message not found"
             )
         
-        # Verify message belongs to user's conversation
-        await message.fetch_link(Message.conversation)
-        await message.conversation.fetch_link(message.conversation.user)
-        
-        if message.conversation.user.id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to provide feedback on this message"
-            )
+        # One atomic upsert replaces find-then-insert/update; the unique
+        # index on message.$id stops concurrent requests creating duplicates.
+        now = datetime.now(timezone.utc)
+        new_feedback_id = new_id()
+        feedback = await FeedbackModel.find_one({"message.$id": message.id}).update(
+            {
+                "$set": {
+                    "rating": feedback_request.rating,
+                    "comment": feedback_request.comment,
+                    "updated_at": now,
+                },
+                "$setOnInsert": {
+                    "feedback_id": new_feedback_id,
+                    "message": DBRef(Message.get_collection_name(), message.id),
+                    "user_id": current_user.user_id,
+                    "created_at": now,
+                },
+            },
+            upsert=True,
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
         
-        # Check if feedback already exists
-        existing_feedback = await FeedbackModel.find_one(
-            FeedbackModel.message.id == message.id
+        created = feedback.feedback_id == new_feedback_id
+        logger.info(
+            "%s feedback for message %s",
+            'Created' if created else 'Updated', message.message_id,
         )
         
-        if existing_feedback:
-            # Update existing feedback
-            existing_feedback.rating = feedback_request.rating
-            existing_feedback.comment = feedback_request.comment
-            await existing_feedback.save()
-            
-            logger.info(f"Updated feedback for message {message.message_id}")
-            
-            return FeedbackResponse(
-                feedback_id=existing_feedback.feedback_id,
-                message="Feedback updated successfully"
-            )
-        else:
-            # Create new feedback
-            feedback = FeedbackModel(
-                message=message,
-                rating=feedback_request.rating,
-                comment=feedback_request.comment
-            )
-            await feedback.insert()
-            
-            logger.info(f"Created feedback for message {message.message_id}")
-            
-            return FeedbackResponse(
-                feedback_id=feedback.feedback_id,
-                message="Feedback submitted successfully"
-            )
+        return FeedbackResponse(
+            feedback_id=feedback.feedback_id,
+            message="Feedback submitted successfully" if created else "Feedback updated successfully"
+        )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error submitting feedback: {e}")
+        logger.error("Error submitting feedback: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error submitting feedback: {str(e)}"
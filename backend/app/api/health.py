@@ -2,12 +2,15 @@
 Health check API endpoint.
 """
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from datetime import datetime, timezone
+import asyncio
 import logging
 import time
 
+from app.models.database import UserAuthView
 from app.models.schemas import HealthCheckResponse, HealthStatus, ServiceHealth
+from app.core.auth import get_current_active_user
 from app.core.database import Database
 from app.core.config import settings
 from app.services.rag_service import rag_service
@@ -16,8 +19,33 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# Probes from Kubernetes, Prometheus and /health often land together; a
+# short-lived cached ping lets them share one round-trip.
+_PING_TTL_SECONDS = 0.5
+_ping_cache: dict = {"at": 0.0, "result": None}
+_ping_lock = asyncio.Lock()
+
+
 async def check_mongodb() -> ServiceHealth:
-    """Check MongoDB connection health."""
+    """Check MongoDB connection health, reusing a ping from the last 500 ms."""
+    cached = _ping_cache["result"]
+    if cached is not None and time.monotonic() - _ping_cache["at"] < _PING_TTL_SECONDS:
+        return cached
+    
+    # Single-flight: concurrent misses wait for one ping instead of each
+    # sending their own, then pick up its result.
+    async with _ping_lock:
+        cached = _ping_cache["result"]
+        if cached is not None and time.monotonic() - _ping_cache["at"] < _PING_TTL_SECONDS:
+            return cached
+        result = await _ping_mongodb()
+        _ping_cache["at"] = time.monotonic()
+        _ping_cache["result"] = result
+        return result
+
+
+async def _ping_mongodb() -> ServiceHealth:
+    """Ping MongoDB and measure the round-trip."""
     try:
         start_time = time.time()
         
@@ -43,8 +71,8 @@ async def check_mongodb() -> ServiceHealth:
         )
 
 
-async def check_vector_store() -> ServiceHealth:
-    """Check vector store health."""
+def check_vector_store() -> ServiceHealth:
+    """Check vector store health (an in-process check, no I/O)."""
     try:
         start_time = time.time()
         
@@ -70,8 +98,8 @@ async def check_vector_store() -> ServiceHealth:
         )
 
 
-async def check_llm() -> ServiceHealth:
-    """Check LLM service health."""
+def check_llm() -> ServiceHealth:
+    """Check LLM service health (an in-process check, no I/O)."""
     try:
         if rag_service.llm:
             return ServiceHealth(
@@ -98,10 +126,11 @@ async def health_check():
     Returns:
         Health status of the application and its dependencies
     """
-    # Check all services
+    # Check all services — only MongoDB needs a round-trip; the other two
+    # just inspect rag_service attributes
     mongodb_health = await check_mongodb()
-    vector_store_health = await check_vector_store()
-    llm_health = await check_llm()
+    vector_store_health = check_vector_store()
+    llm_health = check_llm()
     
     # Determine overall status
     services = {
@@ -148,3 +177,19 @@ async def readiness_probe():
         return {"status": "ready"}
     else:
         return {"status": "not ready"}, status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@router.get("/health/pool")
+async def pool_probe(current_user: UserAuthView = Depends(get_current_active_user)):
+    """
+    MongoDB connection-pool probe (admins only).
+    Reports pool limits and server round-trip times to spot saturation early.
+    Server addresses and latencies describe the deployment, so unlike the
+    other probes this one requires an admin token.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view connection-pool stats",
+        )
+    return Database.pool_stats()
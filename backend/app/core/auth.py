@@ -2,37 +2,87 @@
 Authentication utilities for JWT token handling and password hashing.
 """
 
-from datetime import datetime, timedelta, timezone
-from typing import Optional
-from jose import JWTError, jwt
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional, TypeVar
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from cachetools import TTLCache
+from jose import JWTError, jwk, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.config import settings
-from app.models.database import User
+from app.models.database import User, UserAuthView
 from app.models.schemas import TokenData
 
+T = TypeVar("T")
+
 # bcrypt max password length (hard limit)
 _BCRYPT_MAX_BYTES = 72
 
+# Build the HMAC key once for signing and verification; settings are a
+# process-wide singleton, so the secret and algorithm cannot change after import.
+_SIGNING_KEY = jwk.construct(settings.secret_key, settings.algorithm)
+
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
 
+class _CachedToken(NamedTuple):
+    data: TokenData
+    exp: float
+
+
+# A bearer token is reused for its whole lifetime, so remember tokens that
+# already passed verification. Keys are a digest of the token (the raw
+# token is never stored) and every hit is re-checked against its own exp.
+_JWT_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=settings.access_token_expire_minutes * 60)
+_JWT_CACHE_LOCK = threading.Lock()
+
+# bcrypt is CPU-bound for ~100-250 ms, so it runs on a dedicated pool instead
+# of the event loop. The semaphore caps in-flight hashes so a credential-
+# stuffing burst queues up rather than saturating every core.
+_KDF_EXECUTOR = ThreadPoolExecutor(
+    max_workers=(os.cpu_count() or 1) * 2, thread_name_prefix="kdf"
+)
+_KDF_SEMAPHORE = asyncio.Semaphore(settings.max_inflight_kdf)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    # Truncate to 72 bytes — bcrypt's hard limit
+    # Truncate to 72 bytes — bcrypt's hard limit. The cut is byte-exact (it
+    # may split a codepoint) because existing hashes were made the same way.
     secret = plain_password.encode("utf-8")[:_BCRYPT_MAX_BYTES]
-    hashed = hashed_password.encode("utf-8") if isinstance(hashed_password, str) else hashed_password
-    return bcrypt.checkpw(secret, hashed)
+    # User.hashed_password is always a str; bcrypt hashes are pure ASCII
+    return bcrypt.checkpw(secret, hashed_password.encode("ascii"))
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
     # Truncate to 72 bytes — bcrypt's hard limit
     secret = password.encode("utf-8")[:_BCRYPT_MAX_BYTES]
-    return bcrypt.hashpw(secret, bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(secret, bcrypt.gensalt(rounds=settings.bcrypt_rounds)).decode("utf-8")
+
+
+async def run_kdf(func: Callable[..., T], *args) -> T:
+    """
+    Run a password hashing function off the event loop.
+    
+    Args:
+        func: verify_password or get_password_hash
+        *args: Arguments forwarded to func
+        
+    Returns:
+        Whatever func returns
+    """
+    async with _KDF_SEMAPHORE:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_KDF_EXECUTOR, func, *args)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -48,13 +98,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     """
     to_encode = data.copy()
     
+    # exp is a NumericDate (POSIX seconds), so compute it as one directly
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        lifetime = int(expires_delta.total_seconds())
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
+        lifetime = settings.access_token_expire_minutes * 60
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    to_encode["exp"] = int(time.time()) + lifetime
+    encoded_jwt = jwt.encode(to_encode, _SIGNING_KEY, algorithm=settings.algorithm)
     
     return encoded_jwt
 
@@ -78,14 +129,26 @@ def decode_access_token(token: str) -> TokenData:
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    with _JWT_CACHE_LOCK:
+        hit = _JWT_CACHE.get(key)
+    if hit is not None and hit.exp > time.time():
+        return hit.data
+    
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _SIGNING_KEY, algorithms=[settings.algorithm])
         email: str = payload.get("sub")
         
         if email is None:
             raise credentials_exception
             
         token_data = TokenData(email=email)
+        # Only successfully validated tokens are cached; create_access_token
+        # always sets exp, so a token without it is never reused.
+        exp = payload.get("exp")
+        if exp is not None:
+            with _JWT_CACHE_LOCK:
+                _JWT_CACHE[key] = _CachedToken(data=token_data, exp=float(exp))
         return token_data
         
     except JWTError:
@@ -94,15 +157,18 @@ def decode_access_token(token: str) -> TokenData:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
+) -> UserAuthView:
     """
     Dependency to get the current authenticated user.
     
+    Only the fields needed to authorise a request are fetched; routes that
+    read or change the rest of the profile use get_current_user_document.
+    
     Args:
         credentials: HTTP Bearer credentials from request
         
     Returns:
-        Current user document
+        Current user's auth view
         
     Raises:
         HTTPException: If authentication fails
@@ -110,7 +176,7 @@ async def get_current_user(
     token = credentials.credentials
     token_data = decode_access_token(token)
     
-    user = await User.find_one(User.email == token_data.email)
+    user = await User.find_one(User.email == token_data.email, projection_model=UserAuthView)
     
     if user is None:
         raise HTTPException(
@@ -128,24 +194,33 @@ async def get_current_user(
     return user
 
 
-async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
+async def get_current_user_document(
+    current_user: UserAuthView = Depends(get_current_user)
 ) -> User:
     """
-    Dependency to get the current active user.
+    Dependency to load the full user document for the authenticated user.
     
     Args:
-        current_user: Current user from get_current_user dependency
+        current_user: Auth view from get_current_user
         
     Returns:
-        Current active user
+        Current user document
         
     Raises:
-        HTTPException: If user is inactive
+        HTTPException: If the user was deleted since authentication
     """
-    if not current_user.is_active:
+    user = await User.get(current_user.id)
+    
+    if user is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Inactive user"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    return current_user
+    
+    return user
+
+
+# get_current_user already rejects inactive users, so routes depending on
+# the "active" variant resolve the same dependency with no extra layer.
+get_current_active_user = get_current_user
@@ -0,0 +1,71 @@
+"""
+Short-lived cache of successful password verifications.
+
+bcrypt is deliberately slow (~100 ms per check), so repeated logins from the
+same client within a short window skip the KDF once the password has been
+verified.  Entries are keyed by an HMAC of ``user_id:password`` (the plain
+password is never stored) and remember the hash they were verified against,
+so a password change invalidates them automatically.
+"""
+
+import asyncio
+import hashlib
+import hmac
+
+from cachetools import TTLCache
+
+from app.core.auth import run_kdf, verify_password
+from app.core.config import settings
+from app.models.database import User
+
+_VERIFIED_MAXSIZE = 10_000
+_VERIFIED_TTL_SECONDS = 60
+
+# digest -> (user_id, hashed_password the password was verified against)
+_verified: TTLCache = TTLCache(maxsize=_VERIFIED_MAXSIZE, ttl=_VERIFIED_TTL_SECONDS)
+_lock = asyncio.Lock()
+
+_PEPPER = settings.secret_key.encode("utf-8")
+
+
+def _cache_key(user_id: str, password: str) -> bytes:
+    """Derive the cache key for a user/password pair."""
+    return hmac.new(_PEPPER, f"{user_id}:{password}".encode("utf-8"), hashlib.sha256).digest()
+
+
+async def verify_user_password(user: User, password: str) -> bool:
+    """
+    Verify a user's password, consulting the cache before running bcrypt.
+
+    Args:
+        user: User whose stored hash is checked
+        password: Plain-text password supplied by the client
+
+    Returns:
+        True if the password matches the user's current hash
+    """
+    key = _cache_key(user.user_id, password)
+
+    async with _lock:
+        entry = _verified.get(key)
+
+    if entry is not None:
+        # Constant-time compare against the *current* hash so a stale entry
+        # from before a password change can never authenticate.
+        if hmac.compare_digest(entry[1], user.hashed_password):
+            return True
+
+    if not await run_kdf(verify_password, password, user.hashed_password):
+        return False
+
+    async with _lock:
+        _verified[key] = (user.user_id, user.hashed_password)
+    return True
+
+
+async def invalidate_user(user_id: str) -> None:
+    """Drop every cached verification belonging to a user."""
+    async with _lock:
+        stale = [key for key, (uid, _) in _verified.items() if uid == user_id]
+        for key in stale:
+            _verified.pop(key, None)
@@ -3,10 +3,10 @@ Core configuration settings for the application.
 Loads environment variables and provides typed configuration objects.
 """
 
-from pydantic_settings import BaseSettings
-from pydantic import Field, validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import Field
 from typing import List, Optional
-from functools import lru_cache
+from functools import cached_property, lru_cache
 
 
 class Settings(BaseSettings):
@@ -23,6 +23,8 @@ class Settings(BaseSettings):
     secret_key: str = Field(..., env="SECRET_KEY")
     algorithm: str = Field(default="HS256", env="ALGORITHM")
     access_token_expire_minutes: int = Field(default=1440, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    max_inflight_kdf: int = Field(default=8, env="MAX_INFLIGHT_KDF")  # concurrent bcrypt operations
+    bcrypt_rounds: int = Field(default=12, env="BCRYPT_ROUNDS")  # cost factor for new hashes
     
     # CORS
     cors_origins: str = Field(
@@ -30,7 +32,7 @@ class Settings(BaseSettings):
         env="CORS_ORIGINS"
     )
     
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins into a list."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
@@ -40,6 +42,9 @@ class Settings(BaseSettings):
     mongodb_db_name: str = Field(default="device_troubleshoot", env="MONGODB_DB_NAME")
     mongodb_max_pool_size: int = Field(default=100, env="MONGODB_MAX_POOL_SIZE")
     mongodb_min_pool_size: int = Field(default=10, env="MONGODB_MIN_POOL_SIZE")
+    mongodb_wait_queue_timeout_ms: int = Field(default=5000, env="MONGODB_WAIT_QUEUE_TIMEOUT_MS")
+    # Skip Beanie's index sync at startup; run scripts/create_indexes.py instead
+    skip_index_sync: bool = Field(default=False, env="BEANIE_SKIP_INDEX_SYNC")
     
     # Vector Database - Qdrant Cloud
     qdrant_url: str = Field(default="", env="QDRANT_URL")
@@ -64,12 +69,25 @@ class Settings(BaseSettings):
         env="EMBEDDING_MODEL"
     )
     embedding_dimension: int = Field(default=384, env="EMBEDDING_DIMENSION")
+    # Text Embeddings Inference server; when set, replaces the in-process model
+    tei_url: Optional[str] = Field(default=None, env="TEI_URL")
+    tei_batch_size: int = Field(default=32, env="TEI_BATCH_SIZE")  # <= TEI --max-client-batch-size
+    embedding_device: str = Field(default="auto", env="EMBEDDING_DEVICE")  # auto | cpu | cuda[:N]
+    embedding_batch_size: int = Field(default=64, env="EMBEDDING_BATCH_SIZE")  # texts per encoder forward pass
+    max_embedders: int = Field(default=1, env="MAX_EMBEDDERS")  # in-process model copies for concurrent queries
+    indexing_embed_slab_size: int = Field(default=256, env="INDEXING_EMBED_SLAB_SIZE")  # texts per embed call when indexing
     
     # RAG Configuration
     chunk_size: int = Field(default=1000, env="CHUNK_SIZE")
     chunk_overlap: int = Field(default=200, env="CHUNK_OVERLAP")
     retrieval_top_k: int = Field(default=5, env="RETRIEVAL_TOP_K")
     relevance_threshold: float = Field(default=0.3, env="RELEVANCE_THRESHOLD")
+    retrieval_unfiltered_fallback: bool = Field(default=False, env="RETRIEVAL_UNFILTERED_FALLBACK")  # search all manuals if the device filter finds nothing
+
+    # Answer Cache
+    answer_cache_size: int = Field(default=1000, env="ANSWER_CACHE_SIZE")
+    answer_cache_ttl_seconds: int = Field(default=3600, env="ANSWER_CACHE_TTL_SECONDS")
+    semantic_cache_threshold: float = Field(default=0.95, env="SEMANTIC_CACHE_THRESHOLD")
     
     # Rate Limiting
     rate_limit_per_minute: int = Field(default=100, env="RATE_LIMIT_PER_MINUTE")
@@ -80,8 +98,11 @@ class Settings(BaseSettings):
     allowed_extensions: str = Field(default="pdf,txt,html", env="ALLOWED_EXTENSIONS")
     upload_dir: str = Field(default="./data/uploads", env="UPLOAD_DIR")
     processed_dir: str = Field(default="./data/processed", env="PROCESSED_DIR")
+    pdf_workers: int = Field(default=0, env="PDF_WORKERS")  # PDF extraction processes; 0 = cpu_count - 1
+    pdf_fast_extraction: bool = Field(default=True, env="PDF_FAST_EXTRACTION")  # pdfplumber extract_text_simple for table checks
+    max_concurrent_docs: int = Field(default=2, env="MAX_CONCURRENT_DOCS")  # documents indexed at once
     
-    @property
+    @cached_property
     def allowed_extensions_list(self) -> List[str]:
         """Parse allowed extensions into a list."""
         return [ext.strip() for ext in self.allowed_extensions.split(",")]
@@ -111,9 +132,9 @@ class Settings(BaseSettings):
     enable_voice_input: bool = Field(default=False, env="ENABLE_VOICE_INPUT")
     enable_feedback: bool = Field(default=True, env="ENABLE_FEEDBACK")
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    # Settings are read-only after load; frozen also keeps the cached
+    # list properties above consistent with the fields they derive from.
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
 
 
 @lru_cache()
@@ -13,6 +13,9 @@ from app.models.database import User, Conversation, Message, Feedback, ManualDoc
 
 logger = logging.getLogger(__name__)
 
+# Every Beanie document model; scripts/create_indexes.py syncs the same list
+DOCUMENT_MODELS = [User, Conversation, Message, Feedback, ManualDocument, DeviceCategory]
+
 
 class Database:
     """MongoDB database manager."""
@@ -23,12 +26,14 @@ class Database:
     async def connect_db(cls):
         """Connect to MongoDB and initialize Beanie ODM."""
         try:
-            logger.info(f"Connecting to MongoDB at {settings.mongodb_url}")
+            logger.info("Connecting to MongoDB at %s", settings.mongodb_url)
 
             cls.client = AsyncIOMotorClient(
                 settings.mongodb_url,
                 maxPoolSize=settings.mongodb_max_pool_size,
                 minPoolSize=settings.mongodb_min_pool_size,
+                # Fail fast instead of queueing forever when the pool is exhausted
+                waitQueueTimeoutMS=settings.mongodb_wait_queue_timeout_ms,
                 serverSelectionTimeoutMS=30000,   # 30s — Atlas needs time for replica set discovery
                 connectTimeoutMS=30000,           # 30s — TLS + network handshake
                 socketTimeoutMS=30000,            # 30s — per-operation socket timeout
@@ -40,20 +45,17 @@ class Database:
             # Initialize Beanie with document models
             await init_beanie(
                 database=db,
-                document_models=[
-                    User,
-                    Conversation,
-                    Message,
-                    Feedback,
-                    ManualDocument,
-                    DeviceCategory,
-                ]
+                document_models=DOCUMENT_MODELS,
+                # In production the indexes are created once by
+                # scripts/create_indexes.py, saving the per-model
+                # createIndexes round-trips on every boot.
+                skip_indexes=settings.skip_index_sync,
             )
 
             logger.info("Successfully connected to MongoDB and initialized Beanie")
 
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
+            logger.error("Failed to connect to MongoDB: %s", e)
             raise
     
     @classmethod
@@ -64,6 +66,35 @@ class Database:
             logger.info("MongoDB connection closed")
 
 
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Summarise connection-pool settings and known servers."""
+        if not cls.client:
+            return {"connected": False}
+
+        pool_options = cls.client.options.pool_options
+        servers = [
+            {
+                "address": f"{host}:{port}",
+                "type": server.server_type_name,
+                "round_trip_ms": (
+                    round(server.round_trip_time * 1000, 2)
+                    if server.round_trip_time is not None
+                    else None
+                ),
+            }
+            for (host, port), server in cls.client.topology_description.server_descriptions().items()
+        ]
+        return {
+            "connected": True,
+            "max_pool_size": pool_options.max_pool_size,
+            "min_pool_size": pool_options.min_pool_size,
+            "wait_queue_timeout_ms": settings.mongodb_wait_queue_timeout_ms,
+            "topology": cls.client.topology_description.topology_type_name,
+            "servers": servers,
+        }
+
+
 # Dependency for FastAPI
 async def get_database():
     """Dependency to get database connection."""
@@ -3,14 +3,25 @@ MongoDB document models using Beanie ODM.
 These models represent collections in MongoDB.
 """
 
-from beanie import Document, Indexed, Link
-from pydantic import Field, EmailStr
+from beanie import Document, Indexed, Link, PydanticObjectId
+from pydantic import BaseModel, Field, EmailStr
+from pymongo import ASCENDING, IndexModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 from enum import Enum
+from functools import partial
 import uuid
 
 
+# Timezone-aware "now" for timestamp defaults, bound once for every model
+_utcnow = partial(datetime.now, timezone.utc)
+
+
+def new_id() -> str:
+    """Generate a public record id: a UUID4 as 32 hex chars (no hyphens)."""
+    return uuid.uuid4().hex
+
+
 class DocumentStatus(str, Enum):
     """Status of document processing."""
     PENDING = "pending"
@@ -28,7 +39,7 @@ class MessageRole(str, Enum):
 class User(Document):
     """User account document."""
     
-    user_id: Indexed(str) = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: Indexed(str) = Field(default_factory=new_id)
     email: Indexed(EmailStr, unique=True)
     hashed_password: str
     is_active: bool = True
@@ -37,13 +48,13 @@ class User(Document):
     full_name: Optional[str] = None
     bio: Optional[str] = None
     avatar_color: Optional[str] = None   # hex color chosen by user
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     
     class Settings:
         name = "users"
+        # email's unique index comes from Indexed(..., unique=True) above
         indexes = [
-            "email",
             "user_id",
         ]
 
@@ -51,20 +62,21 @@ class User(Document):
 class Conversation(Document):
     """Conversation document storing chat sessions."""
     
-    conversation_id: Indexed(str) = Field(default_factory=lambda: str(uuid.uuid4()))
+    conversation_id: Indexed(str, unique=True) = Field(default_factory=new_id)
     user: Link[User]
+    user_id: Optional[str] = None        # denormalised User.user_id for owner-scoped queries
     title: Optional[str] = None          # LLM-generated, set after first message
     device_type: Optional[str] = None
     brand: Optional[str] = None
     model: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     
     class Settings:
         name = "conversations"
         indexes = [
-            "conversation_id",
             "user",
+            "user_id",
             "device_type",
             "created_at",
         ]
@@ -86,36 +98,46 @@ class Source(Document):
 class Message(Document):
     """Message document in a conversation."""
     
-    message_id: Indexed(str) = Field(default_factory=lambda: str(uuid.uuid4()))
+    message_id: Indexed(str) = Field(default_factory=new_id)
     conversation: Link[Conversation]
+    user_id: Optional[str] = None  # owner of the conversation (denormalised)
     role: MessageRole
     content: str
     sources: Optional[List[Dict[str, Any]]] = []
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_utcnow)
     
     class Settings:
         name = "messages"
         indexes = [
             "message_id",
             "conversation",
+            "user_id",
             "created_at",
+            # Serves the sorted conversation-history query; _id breaks
+            # created_at ties so the page cursor is unique
+            IndexModel([("conversation.$id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
         ]
 
 
 class Feedback(Document):
     """User feedback on assistant responses."""
     
-    feedback_id: Indexed(str) = Field(default_factory=lambda: str(uuid.uuid4()))
+    feedback_id: Indexed(str) = Field(default_factory=new_id)
     message: Link[Message]
+    user_id: Optional[str] = None  # owner of the rated message (denormalised)
     rating: int  # 1 (thumbs down) or 5 (thumbs up)
     comment: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: Optional[datetime] = None
     
     class Settings:
         name = "feedback"
         indexes = [
             "feedback_id",
             "message",
+            # One feedback per message — makes the submit upsert race-free
+            IndexModel([("message.$id", ASCENDING)], unique=True),
+            "user_id",
             "rating",
             "created_at",
         ]
@@ -124,46 +146,101 @@ class Feedback(Document):
 class ManualDocument(Document):
     """Document metadata for uploaded manuals."""
     
-    document_id: Indexed(str) = Field(default_factory=lambda: str(uuid.uuid4()))
+    document_id: Indexed(str, unique=True) = Field(default_factory=new_id)
     filename: str
     device_type: Indexed(str)
     brand: Indexed(str)
     model: Optional[str] = None
     file_path: str
     file_size: int  # in bytes
+    content_hash: Optional[str] = None  # sha256 of the uploaded file
+    # document_id whose vectors serve this upload when it duplicated an
+    # already-indexed file; None means the vectors are tagged with our own id
+    vectors_document_id: Optional[str] = None
     status: DocumentStatus = DocumentStatus.PENDING
     error_message: Optional[str] = None
     chunks_count: int = 0
+    # Bumped on every (re)processing run; tags that run's vectors in Qdrant
+    version: int = 0
     uploaded_by: Link[User]
-    uploaded_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    user_id: Optional[str] = None  # denormalised uploaded_by.user_id
+    uploaded_at: datetime = Field(default_factory=_utcnow)
     processed_at: Optional[datetime] = None
     
     class Settings:
         name = "documents"
         indexes = [
-            "document_id",
+            "user_id",
             "device_type",
             "brand",
             "model",
             "status",
             "uploaded_at",
+            "content_hash",
         ]
 
 
 class DeviceCategory(Document):
     """Device category and supported models."""
     
-    category_id: Indexed(str) = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str  # e.g., "Refrigerator", "Washing Machine"
+    category_id: Indexed(str) = Field(default_factory=new_id)
+    name: Indexed(str, unique=True)  # e.g., "Refrigerator", "Washing Machine"
     brands: List[str] = []
     models: Dict[str, List[str]] = {}  # {brand: [model1, model2]}
     icon: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
     
     class Settings:
         name = "device_categories"
         indexes = [
             "category_id",
-            "name",
         ]
+
+
+# ============================================================================
+# Projection views
+# ============================================================================
+# Lightweight read models for list endpoints — Beanie only fetches the
+# fields declared here, so heavy or unused fields never cross the wire.
+
+class UserAuthView(BaseModel):
+    """The slice of a user that request authentication needs (no password hash)."""
+    
+    id: PydanticObjectId = Field(alias="_id")
+    user_id: str
+    email: str
+    is_active: bool
+    is_admin: bool = False
+
+
+class ConversationSummary(BaseModel):
+    """Fields of a conversation needed to render the sidebar list."""
+    
+    id: PydanticObjectId = Field(alias="_id")
+    conversation_id: str
+    title: Optional[str] = None
+    device_type: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class MessageKey(BaseModel):
+    """Just enough of a message to reference it from another document."""
+    
+    id: PydanticObjectId = Field(alias="_id")
+    message_id: str
+
+
+class MessageView(BaseModel):
+    """Message fields returned in conversation history (no conversation link)."""
+    
+    id: PydanticObjectId = Field(alias="_id")
+    message_id: str
+    role: MessageRole
+    content: str
+    sources: Optional[List[Dict[str, Any]]] = []
+    created_at: datetime
+
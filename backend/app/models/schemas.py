@@ -214,6 +214,8 @@ class ConversationHistoryResponse(BaseModel):
     """Response model for conversation history."""
     conversation: ConversationResponse
     messages: List[MessageResponse]
+    next_cursor: Optional[datetime] = None   # pass as ?before= for older messages
+    next_cursor_id: Optional[str] = None     # ...together with ?before_id=
 
 
 # ============================================================================
@@ -0,0 +1,205 @@
+"""
+Answer cache sitting in front of the RAG pipeline.
+
+Two tiers:
+  1. Exact match   — sha256 of the normalised query + device scope + model.
+  2. Semantic match — cosine similarity between the query embedding and the
+     embeddings of previously answered queries in the same scope.
+
+Embeddings are L2-normalised by the encoder, so cosine similarity is a plain
+dot product. Each (scope, ai_model) keeps its embeddings as rows of one
+preallocated float32 matrix, updated as entries are stored, invalidated or
+expire, so a semantic lookup is a single matrix-vector product.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+Scope = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case and collapse whitespace so trivially different queries match."""
+    return _WHITESPACE_RE.sub(" ", query).strip().lower()
+
+
+class _EmbeddingMatrix:
+    """Query embeddings of one (scope, ai_model) as rows of a float32 matrix.
+
+    Rows ``[0, len(keys))`` are live. Capacity doubles when full, and a
+    removed row is filled with the last one, so both stay O(dim).
+    """
+
+    _INITIAL_ROWS = 16
+
+    def __init__(self, dim: int):
+        self.matrix = np.empty((self._INITIAL_ROWS, dim), dtype=np.float32)
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def add(self, key: str, vector: np.ndarray) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.matrix):
+                grown = np.empty((2 * len(self.matrix), self.matrix.shape[1]), dtype=np.float32)
+                grown[:row] = self.matrix
+                self.matrix = grown
+            self.rows[key] = row
+            self.keys.append(key)
+        self.matrix[row] = vector
+
+    def remove(self, key: str) -> None:
+        row = self.rows.pop(key)
+        last_key = self.keys.pop()
+        if last_key != key:
+            self.matrix[row] = self.matrix[len(self.keys)]
+            self.keys[row] = last_key
+            self.rows[last_key] = row
+
+    def best(self, query: np.ndarray) -> Tuple[str, float]:
+        """Key and similarity of the row closest to ``query``."""
+        scores = self.matrix[: len(self.keys)] @ query
+        best = int(np.argmax(scores))
+        return self.keys[best], float(scores[best])
+
+
+class _ExactCache(TTLCache):
+    """TTLCache that reports every key it drops (expiry, eviction, delete)."""
+
+    def __init__(self, maxsize: int, ttl: int, on_remove: Callable[[str], None], **kwargs):
+        super().__init__(maxsize=maxsize, ttl=ttl, **kwargs)
+        self._on_remove = on_remove
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_remove(key)
+
+    def expire(self, time=None):
+        # Expiry bypasses __delitem__
+        expired = super().expire(time)
+        for key, _ in expired:
+            self._on_remove(key)
+        return expired
+
+
+class AnswerCache:
+    """Exact + semantic cache of ``{answer, sources}`` results."""
+
+    def __init__(
+        self,
+        maxsize: int = settings.answer_cache_size,
+        ttl: int = settings.answer_cache_ttl_seconds,
+        threshold: float = settings.semantic_cache_threshold,
+    ):
+        self.threshold = threshold
+        # key -> (scope, ai_model, result)
+        self._exact = _ExactCache(maxsize=maxsize, ttl=ttl, on_remove=self._drop_vector)
+        # (scope, ai_model) -> embeddings of its cached queries
+        self._matrices: Dict[Tuple[Scope, str], _EmbeddingMatrix] = {}
+        # key -> the (scope, ai_model) whose matrix holds its embedding
+        self._matrix_of: Dict[str, Tuple[Scope, str]] = {}
+
+    @staticmethod
+    def make_key(query: str, scope: Scope, ai_model: str) -> str:
+        """Build the exact-match key for a query within a device scope."""
+        raw = "\x1f".join([normalize_query(query), *(part or "" for part in scope), ai_model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for an exact key, if any."""
+        entry = self._exact.get(key)
+        return entry[2] if entry is not None else None
+
+    def get_semantic(
+        self, embedding: List[float], scope: Scope, ai_model: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return the closest cached result above the similarity threshold."""
+        # Drops the rows of expired entries before scoring
+        self._exact.expire()
+        matrix = self._matrices.get((scope, ai_model))
+        if matrix is None:
+            return None
+
+        key, score = matrix.best(np.asarray(embedding, dtype=np.float32))
+        if score < self.threshold:
+            return None
+
+        logger.debug("Semantic cache hit (similarity %.3f)", score)
+        return self._exact[key][2]
+
+    def put(
+        self,
+        key: str,
+        scope: Scope,
+        ai_model: str,
+        result: Dict[str, Any],
+        embedding: Optional[List[float]] = None,
+    ) -> None:
+        """Store a RAG result (and its query embedding for semantic lookups)."""
+        self._exact[key] = (scope, ai_model, result)
+        if embedding is None:
+            self._drop_vector(key)
+            return
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        bucket = (scope, ai_model)
+        matrix = self._matrices.get(bucket)
+        if matrix is None:
+            matrix = self._matrices[bucket] = _EmbeddingMatrix(vector.shape[0])
+        matrix.add(key, vector)
+        self._matrix_of[key] = bucket
+
+    def _drop_vector(self, key: str) -> None:
+        """Remove ``key``'s embedding row, if it has one."""
+        bucket = self._matrix_of.pop(key, None)
+        if bucket is None:
+            return
+        matrix = self._matrices[bucket]
+        matrix.remove(key)
+        if not matrix.keys:
+            del self._matrices[bucket]
+
+    def invalidate(
+        self,
+        device_type: Optional[str] = None,
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> None:
+        """
+        Drop every entry whose answer could have used documents in this scope.
+
+        A cached query matches when each of its scope fields is either unset
+        (an unfiltered search may have hit the document) or equal to the
+        document's value.  ``model=None`` on the document side means any model.
+        """
+        target = (device_type, brand, model)
+        stale = [
+            key
+            for key, (scope, _, _) in list(self._exact.items())
+            if all(
+                cached is None or wanted is None or cached == wanted
+                for cached, wanted in zip(scope, target)
+            )
+        ]
+        for key in stale:
+            # Deleting from _exact also drops the embedding row
+            self._exact.pop(key, None)
+
+        if stale:
+            logger.info("Invalidated %s cached answer(s) for %s", len(stale), target)
+
+
+# Global answer cache instance
+answer_cache = AnswerCache()
@@ -2,25 +2,93 @@
 Document processing service for extracting and indexing manual content.
 """
 
-import re
+import asyncio
 import logging
-from typing import List, Dict, Any, Tuple
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 from pathlib import Path
 
-import fitz  # PyMuPDF
-import pdfplumber
+import aiofiles
 
 from app.models.database import ManualDocument, DocumentStatus
+from app.services import pdf_extraction
 from app.services.rag_service import rag_service
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Pattern to detect page-number-only chunks (e.g. "English - 14", "- 14 -", or "14")
-_PAGE_NUM_RE = re.compile(
-    r"^(?:[A-Za-z]+ - \d+|- \d+ -|\d+)$"
+# Below this many pages per shard, process start-up and file re-opening
+# cost more than the parallelism saves.
+_MIN_PAGES_PER_SHARD = 8
+
+# Metadata heuristics, compiled once. re.ASCII keeps IGNORECASE to ASCII
+# case folding, which matches what line.lower() + substring checks found
+# (Unicode folding would also accept e.g. "İNSTALLATION" or "Uſer Manual").
+_METADATA_SCAN_LINES = 50
+_MODEL_LINE_RE = re.compile(r"^(?=.{0,99}$).*model.*$", re.IGNORECASE | re.ASCII | re.MULTILINE)
+# One named group per section type; match.lastgroup is the type
+_SECTION_RE = re.compile(
+    r"(?P<troubleshooting>troubleshooting)|(?P<installation>installation)"
+    r"|(?P<user_guide>user guide|user manual)",
+    re.IGNORECASE | re.ASCII,
 )
+_SECTION_PRIORITY = ("troubleshooting", "installation", "user_guide")
+
+# Shared across documents and created on first use
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_workers = 0
+
+# Caps how many documents are indexed at once, across uploads and reindexes
+_doc_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_doc_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent document processing."""
+    global _doc_semaphore
+    if _doc_semaphore is None:
+        _doc_semaphore = asyncio.Semaphore(max(settings.max_concurrent_docs, 1))
+    return _doc_semaphore
+
+
+def _get_pdf_pool() -> Tuple[ProcessPoolExecutor, int]:
+    """Return the PDF extraction process pool and its worker count."""
+    global _pdf_pool, _pdf_pool_workers
+    if _pdf_pool is None:
+        _pdf_pool_workers = settings.pdf_workers or max((os.cpu_count() or 2) - 1, 1)
+        # spawn, not Linux's default fork: forking would copy the embedding
+        # model, Motor and the executor threads into every worker (and can
+        # deadlock on locks those threads held). Spawned workers start from
+        # a fresh interpreter and import only pdf_extraction.
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=_pdf_pool_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pdf_pool, _pdf_pool_workers
+
+
+def _reset_pdf_pool() -> None:
+    """Discard a broken pool so the next extraction starts a new one."""
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+def _page_ranges(n_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """Split ``[0, n_pages)`` into at most ``workers`` contiguous ranges."""
+    shards = max(1, min(workers, n_pages // _MIN_PAGES_PER_SHARD))
+    step, extra = divmod(n_pages, shards)
+    ranges, start = [], 0
+    for i in range(shards):
+        end = start + step + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
 
 
 class DocumentProcessor:
@@ -31,182 +99,62 @@ class DocumentProcessor:
         self.text_splitter = rag_service.text_splitter
 
     # ------------------------------------------------------------------
-    # Text extraction (fitz / PyMuPDF)
+    # PDF extraction (fitz text + pdfplumber tables, across processes)
     # ------------------------------------------------------------------
 
-    def _extract_text_chunks(self, file_path: str) -> List[str]:
-        """
-        Extract text from a digital PDF page by page using PyMuPDF (fitz).
-        Splits each page's text into overlapping chunks of 1000 chars / 200 overlap,
-        then filters out noise chunks.
-
-        Returns:
-            List of clean text chunk strings.
-        """
-        chunk_size = 1000
-        overlap = 200
-        min_len = 30
-
-        chunks: List[str] = []
-
-        with fitz.open(file_path) as doc:
-            for page_num, page in enumerate(doc, start=1):
-                page_text = page.get_text("text")
-                if not page_text or not page_text.strip():
-                    continue
-
-                # Slide a window over the page text
-                start = 0
-                while start < len(page_text):
-                    end = start + chunk_size
-                    chunk = page_text[start:end].strip()
-
-                    if len(chunk) >= min_len and not _PAGE_NUM_RE.match(chunk):
-                        chunks.append(chunk)
-
-                    start += chunk_size - overlap  # advance with overlap
-
-        logger.info(f"Extracted {len(chunks)} text chunks via PyMuPDF (fitz)")
-        return chunks
-
-    # ------------------------------------------------------------------
-    # Table extraction (pdfplumber)
-    # ------------------------------------------------------------------
-
-    def _extract_table_chunks(
+    async def _extract_pdf(
         self, file_path: str
-    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+    ) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
         """
-        Extract tables from each page using pdfplumber.
-
-        - Clean / simple tables  → converted to GitHub-flavoured markdown.
-        - Lossy / complex tables → raw page text extracted via fitz is used
-          instead, so that multi-column spec tables (e.g. Samsung QLED with
-          3 model columns) are stored without data loss.
+        Extract text chunks and table chunks from a PDF.
 
-        A table is considered lossy when >40 % of its cells are empty after
-        pdfplumber parsing, which indicates a complex layout it cannot handle.
+        The page range is split into contiguous shards that run on the
+        shared process pool, so pdfplumber's pure-Python layout analysis
+        uses every core instead of one GIL-bound thread. Shard results are
+        joined in page order, giving the same output as a sequential pass.
 
         Returns:
-            (table_texts, table_metadatas) — parallel lists ready for Qdrant.
-        """
-        texts: List[str] = []
-        metadatas: List[Dict[str, Any]] = []
-
-        # Pages already emitted as fitz fallback — avoid duplicates
-        fallback_pages_added: set = set()
-
-        with pdfplumber.open(file_path) as pdf, fitz.open(file_path) as fitz_doc:
-            for page_num, page in enumerate(pdf.pages, start=1):
-                tables = page.extract_tables()
-                if not tables:
-                    continue
-
-                # Full page text for coverage comparison
-                page_full_text = page.extract_text() or ""
-
-                for table in tables:
-                    # Skip rows that are entirely empty / None
-                    non_empty_rows = [
-                        row for row in table if any(cell for cell in row if cell)
-                    ]
-                    if not non_empty_rows:
-                        continue
-
-                    if self._is_table_lossy(non_empty_rows, page_full_text):
-                        # Complex multi-column layout — fall back to fitz raw text
-                        if page_num not in fallback_pages_added:
-                            fitz_page = fitz_doc[page_num - 1]
-                            raw_text = fitz_page.get_text("text").strip()
-                            if raw_text:
-                                texts.append(
-                                    f"Specifications on page {page_num}:\n{raw_text}"
-                                )
-                                metadatas.append(
-                                    {"source": "table_text", "page": page_num}
-                                )
-                                fallback_pages_added.add(page_num)
-                                logger.debug(
-                                    f"Page {page_num}: lossy table — stored as raw text fallback"
-                                )
-                    else:
-                        # Clean table — store as markdown
-                        markdown = self._table_to_markdown(non_empty_rows)
-                        texts.append(f"Table on page {page_num}:\n{markdown}")
-                        metadatas.append({"source": "table", "page": page_num})
-
-        clean = sum(1 for m in metadatas if m["source"] == "table")
-        fallback = sum(1 for m in metadatas if m["source"] == "table_text")
-        logger.info(
-            f"Table extraction: {clean} markdown tables, "
-            f"{fallback} complex-table pages stored as raw text"
-        )
-        return texts, metadatas
-
-    @staticmethod
-    def _is_table_lossy(
-        rows: List[List],
-        page_full_text: str = "",
-        empty_threshold: float = 0.4,
-        coverage_threshold: float = 0.40,
-    ) -> bool:
-        """
-        Return True if the table appears to have lost data during parsing.
-
-        Two complementary checks:
-
-        1. **Empty-cell ratio** — if >*empty_threshold* of cells are blank,
-           pdfplumber likely failed on a merged-cell layout.
-
-        2. **Text-coverage ratio** — only applied to real multi-column data
-           tables (cols > 1 and rows > 3).  Compares the total characters
-           captured inside the table against the full page text. If the table
-           covers <*coverage_threshold* of the page text, columns were silently
-           dropped (e.g. a 3-column spec table parsed as 2 columns).
+            (text_chunks, table_texts, table_metadatas)
         """
-        total_cells = sum(len(row) for row in rows)
-        if total_cells == 0:
-            return True
-
-        # Check 1: too many empty cells
-        empty = sum(
-            1 for row in rows for cell in row
-            if cell is None or not str(cell).strip()
-        )
-        if (empty / total_cells) > empty_threshold:
-            return True
+        loop = asyncio.get_running_loop()
+        n_pages = await loop.run_in_executor(None, pdf_extraction.page_count, file_path)
+        pool, workers = _get_pdf_pool()
+        shards = _page_ranges(n_pages, workers)
 
-        # Check 2: coverage, but only for real multi-column data tables
-        # (skip small UI / navigation tables with 1 col or <= 3 rows)
-        num_cols = len(rows[0]) if rows else 0
-        num_rows = len(rows)
-        if page_full_text.strip() and num_cols > 1 and num_rows > 3:
-            table_text = " ".join(
-                str(cell) for row in rows for cell in row
-                if cell is not None and str(cell).strip()
+        try:
+            text_parts, table_parts = await asyncio.gather(
+                asyncio.gather(*(
+                    loop.run_in_executor(pool, pdf_extraction.extract_text_range, file_path, start, end)
+                    for start, end in shards
+                )),
+                asyncio.gather(*(
+                    loop.run_in_executor(
+                        pool, pdf_extraction.extract_table_range, file_path, start, end,
+                        settings.pdf_fast_extraction,
+                    )
+                    for start, end in shards
+                )),
             )
-            coverage = len(table_text) / max(len(page_full_text), 1)
-            if coverage < coverage_threshold:
-                return True
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge page); start a fresh pool
+            # next time rather than failing every later upload.
+            _reset_pdf_pool()
+            raise
 
-        return False
+        text_chunks = [chunk for part in text_parts for chunk in part]
+        table_texts = [text for texts, _ in table_parts for text in texts]
+        table_metadatas = [meta for _, metas in table_parts for meta in metas]
 
-    @staticmethod
-    def _table_to_markdown(rows: List[List]) -> str:
-        """Convert a list of rows into a GitHub-flavoured markdown table."""
-        if not rows:
-            return ""
-
-        def cell(val) -> str:
-            return str(val).strip() if val is not None else ""
-
-        header = "| " + " | ".join(cell(c) for c in rows[0]) + " |"
-        divider = "| " + " | ".join("---" for _ in rows[0]) + " |"
-        body_rows = [
-            "| " + " | ".join(cell(c) for c in row) + " |"
-            for row in rows[1:]
-        ]
-        return "\n".join([header, divider] + body_rows)
+        clean = sum(1 for m in table_metadatas if m["source"] == "table")
+        logger.info(
+            "Extracted %s text chunks via PyMuPDF (fitz) from %s pages in %s shard(s)",
+            len(text_chunks), n_pages, len(shards),
+        )
+        logger.info(
+            "Table extraction: %s markdown tables, %s complex-table pages stored as raw text",
+            clean, len(table_metadatas) - clean,
+        )
+        return text_chunks, table_texts, table_metadatas
 
     # ------------------------------------------------------------------
     # Metadata helpers
@@ -223,22 +171,37 @@ class DocumentProcessor:
             Dictionary of extracted metadata.
         """
         metadata: Dict[str, Any] = {}
-        lines = text.split("\n")[:50]  # inspect first 50 lines only
+        # Inspect the first 50 lines only, without splitting the rest
+        lines = text.split("\n", _METADATA_SCAN_LINES)[:_METADATA_SCAN_LINES]
+
+        # The last short line mentioning "model" wins
+        model_match = None
+        for model_match in _MODEL_LINE_RE.finditer("\n".join(lines)):
+            pass
+        if model_match is not None:
+            metadata["detected_model"] = model_match.group().strip()
+
+        # The last line naming a section wins; within a line, troubleshooting
+        # beats installation beats user guide/manual
+        for line in reversed(lines):
+            found = {m.lastgroup for m in _SECTION_RE.finditer(line)}
+            if found:
+                metadata["section_type"] = next(t for t in _SECTION_PRIORITY if t in found)
+                break
 
-        for line in lines:
-            line_lower = line.lower()
-
-            if "model" in line_lower and len(line) < 100:
-                metadata["detected_model"] = line.strip()
+        return metadata
 
-            if "troubleshooting" in line_lower:
-                metadata["section_type"] = "troubleshooting"
-            elif "installation" in line_lower:
-                metadata["section_type"] = "installation"
-            elif "user guide" in line_lower or "user manual" in line_lower:
-                metadata["section_type"] = "user_guide"
+    @staticmethod
+    async def _update_status(
+        document: ManualDocument, status: DocumentStatus, **fields: Any
+    ) -> None:
+        """
+        Set a document's status, plus any other fields, in one update.
 
-        return metadata
+        A partial ``$set`` of just these fields rather than a full-document
+        replace; the local object is updated to match.
+        """
+        await document.set({"status": status, **fields})
 
     # ------------------------------------------------------------------
     # Main processing entry-point
@@ -254,37 +217,37 @@ class DocumentProcessor:
         Returns:
             True if successful, False otherwise.
         """
+        # Set once this run's version is saved, so a failure only ever
+        # cleans up the vectors this run wrote
+        indexing_version = None
+        document: Optional[ManualDocument] = None
         try:
             document = await ManualDocument.get(document_id)
             if not document:
-                logger.error(f"Document {document_id} not found")
+                logger.error("Document %s not found", document_id)
                 return False
 
-            logger.info(f"Processing document: {document.filename}")
+            logger.info("Processing document: %s", document.filename)
 
-            document.status = DocumentStatus.PROCESSING
-            await document.save()
+            await self._update_status(
+                document, DocumentStatus.PROCESSING, version=document.version + 1
+            )
+            indexing_version = document.version
 
             file_ext = Path(document.file_path).suffix.lower()
 
             if file_ext == ".pdf":
-                import asyncio
-                from functools import partial
-
-                loop = asyncio.get_running_loop()
-
-                # Run both extractions in executor (blocking I/O)
-                text_chunks = await loop.run_in_executor(
-                    None, partial(self._extract_text_chunks, document.file_path)
-                )
-                table_texts, table_chunk_metadatas = await loop.run_in_executor(
-                    None, partial(self._extract_table_chunks, document.file_path)
+                text_chunks, table_texts, table_chunk_metadatas = await self._extract_pdf(
+                    document.file_path
                 )
 
             elif file_ext in (".txt", ".text"):
-                with open(document.file_path, "r", encoding="utf-8") as f:
-                    raw = f.read()
-                text_chunks = self.text_splitter.split_text(raw)
+                async with aiofiles.open(document.file_path, "r", encoding="utf-8") as f:
+                    raw = await f.read()
+                # Splitting a large file is CPU work; keep it off the loop too
+                text_chunks = await asyncio.get_running_loop().run_in_executor(
+                    None, self.text_splitter.split_text, raw
+                )
                 table_texts, table_chunk_metadatas = [], []
             else:
                 raise ValueError(f"Unsupported file type: {file_ext}")
@@ -301,68 +264,77 @@ class DocumentProcessor:
                 " ".join(text_chunks[:5])  # quick heuristic over first few chunks
             )
 
-            metadatas: List[Dict[str, Any]] = []
-
-            for i, chunk in enumerate(text_chunks):
-                metadatas.append(
-                    {
-                        "source_file": document.filename,
-                        "device_type": document.device_type,
-                        "brand": document.brand,
-                        "model": document.model or "Unknown",
-                        "document_id": document.document_id,
-                        "chunk_index": i,
-                        "total_chunks": len(all_chunks),
-                        **auto_metadata,
-                    }
-                )
-
-            for i, (table_text, tbl_meta) in enumerate(
-                zip(table_texts, table_chunk_metadatas)
-            ):
-                metadatas.append(
-                    {
-                        "source_file": document.filename,
-                        "device_type": document.device_type,
-                        "brand": document.brand,
-                        "model": document.model or "Unknown",
-                        "document_id": document.document_id,
-                        "chunk_index": len(text_chunks) + i,
-                        "total_chunks": len(all_chunks),
-                        **auto_metadata,
-                        **tbl_meta,  # source="table", page=X override
-                    }
-                )
+            # Everything but chunk_index (and a table's own fields) is shared
+            base_metadata: Dict[str, Any] = {
+                "source_file": document.filename,
+                "device_type": document.device_type,
+                "brand": document.brand,
+                "model": document.model or "Unknown",
+                "document_id": document.document_id,
+                "total_chunks": len(all_chunks),
+                "version": document.version,
+                **auto_metadata,
+            }
+            n_text = len(text_chunks)
+            metadatas: List[Dict[str, Any]] = [
+                {**base_metadata, "chunk_index": i} for i in range(n_text)
+            ]
+            metadatas.extend(
+                # table metadata (source="table", page=X) overrides the base
+                {**base_metadata, "chunk_index": n_text + i, **tbl_meta}
+                for i, tbl_meta in enumerate(table_chunk_metadatas)
+            )
 
             logger.info(
-                f"Indexing {len(all_chunks)} chunks "
-                f"({len(text_chunks)} text, {len(table_texts)} tables)"
+                "Indexing %s chunks (%s text, %s tables)",
+                len(all_chunks), len(text_chunks), len(table_texts),
             )
 
+            # Deterministic ids make upsert retries idempotent
             chunks_added = await rag_service.add_documents(
                 texts=all_chunks,
                 metadatas=metadatas,
+                ids=[
+                    rag_service.chunk_point_id(document.document_id, document.version, i)
+                    for i in range(len(all_chunks))
+                ],
+            )
+
+            # The new run is complete — drop vectors from earlier runs
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, rag_service.delete_stale_versions, document.document_id, document.version
             )
 
-            document.status = DocumentStatus.INDEXED
-            document.chunks_count = chunks_added
-            document.processed_at = datetime.now(timezone.utc)
-            await document.save()
+            await self._update_status(
+                document, DocumentStatus.INDEXED,
+                chunks_count=chunks_added,
+                processed_at=datetime.now(timezone.utc),
+            )
 
-            logger.info(f"Successfully processed document: {document.filename}")
+            logger.info("Successfully processed document: %s", document.filename)
             return True
 
         except Exception as e:
-            logger.error(f"Error processing document: {e}")
+            logger.error("Error processing document: %s", e)
 
             try:
-                document = await ManualDocument.get(document_id)
+                # Reuse the loaded document; fetch only if loading it failed
+                if document is None:
+                    document = await ManualDocument.get(document_id)
+                if document and indexing_version is not None:
+                    # Remove this run's partial upload; earlier runs stay intact
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(
+                        None, rag_service.delete_document_version,
+                        document.document_id, indexing_version,
+                    )
                 if document:
-                    document.status = DocumentStatus.FAILED
-                    document.error_message = str(e)
-                    await document.save()
+                    await self._update_status(
+                        document, DocumentStatus.FAILED, error_message=str(e)
+                    )
             except Exception as save_error:
-                logger.error(f"Error updating document status: {save_error}")
+                logger.error("Error updating document status: %s", save_error)
 
             return False
 
@@ -371,12 +343,21 @@ class DocumentProcessor:
 # Background task helper
 # ---------------------------------------------------------------------------
 
-async def process_document_task(document_id: str):
+async def process_document_task(document_id: str) -> bool:
     """
     Background task to process a document.
 
+    Waits for a free processing slot, so a burst of uploads and reindexes
+    overlaps at most ``max_concurrent_docs`` documents instead of all of
+    them.
+
     Args:
         document_id: Document ID to process
+
+    Returns:
+        True if successful, False otherwise.
     """
-    processor = DocumentProcessor()
-    await processor.process_document(document_id)
+    async with _get_doc_semaphore():
+        processor = DocumentProcessor()
+        return await processor.process_document(document_id)
+
@@ -0,0 +1,69 @@
+"""
+Pool of in-process embedding model copies for concurrent callers.
+
+A single HuggingFaceEmbeddings instance serialises every concurrent query
+through one model. The pool hands each caller thread its own copy, creating
+copies lazily up to a fixed size so memory stays bounded; callers beyond
+that wait for a copy to be returned.
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+from langchain_core.embeddings import Embeddings
+
+
+class EmbedderPool(Embeddings):
+    """Embeddings that borrow one of up to ``size`` model copies per call.
+
+    The async methods inherited from Embeddings run the sync ones in the
+    default executor, so concurrent awaits land on different threads and
+    each thread checks out a different copy.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], size: int):
+        """
+        Args:
+            factory: Builds one model copy
+            size: Maximum number of copies
+        """
+        self._factory = factory
+        self._size = max(size, 1)
+        self._idle: "queue.LifoQueue[Embeddings]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        # Load the first copy up front so start-up fails fast, as before
+        self._idle.put(factory())
+        self._created = 1
+
+    @contextmanager
+    def _borrow(self) -> Iterator[Embeddings]:
+        try:
+            embedder = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self._size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    embedder = self._factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                embedder = self._idle.get()
+        try:
+            yield embedder
+        finally:
+            self._idle.put(embedder)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._borrow() as embedder:
+            return embedder.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._borrow() as embedder:
+            return embedder.embed_query(text)
@@ -0,0 +1,209 @@
+"""
+Page-range PDF extraction workers.
+
+These functions run inside a process pool whose workers are spawned (not
+forked), so each worker imports just this module — which is why it
+deliberately imports nothing from the app beyond the PDF libraries: worker
+processes must not pull in the RAG service, embedding model or database
+stack.
+Each function opens its own file handle and works on pages
+``[start, end)`` (0-based), returning results in page order.
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+# Pattern to detect page-number-only chunks (e.g. "English - 14", "- 14 -", or "14")
+_PAGE_NUM_RE = re.compile(
+    r"^(?:[A-Za-z]+ - \d+|- \d+ -|\d+)$"
+)
+
+TEXT_CHUNK_SIZE = 1000
+TEXT_CHUNK_OVERLAP = 200
+TEXT_CHUNK_MIN_LEN = 30
+
+# Fast page text averaging more characters per word than this has lost
+# its spaces, so the layout-aware extraction is used instead
+_FAST_TEXT_MAX_WORD_LEN = 25
+
+
+def page_count(file_path: str) -> int:
+    """Return the number of pages in a PDF."""
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+
+def extract_text_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Extract text chunks from pages ``[start, end)`` using PyMuPDF (fitz).
+    Splits each page's text into overlapping chunks of 1000 chars / 200 overlap,
+    then filters out noise chunks.
+
+    Returns:
+        List of clean text chunk strings.
+    """
+    chunks: List[str] = []
+
+    with fitz.open(file_path) as doc:
+        for page_index in range(start, end):
+            page_text = doc[page_index].get_text("text")
+            if not page_text or not page_text.strip():
+                continue
+
+            # Slide a window over the page text
+            pos = 0
+            while pos < len(page_text):
+                chunk = page_text[pos:pos + TEXT_CHUNK_SIZE].strip()
+
+                if len(chunk) >= TEXT_CHUNK_MIN_LEN and not _PAGE_NUM_RE.match(chunk):
+                    chunks.append(chunk)
+
+                pos += TEXT_CHUNK_SIZE - TEXT_CHUNK_OVERLAP  # advance with overlap
+
+    return chunks
+
+
+def _page_text(page, fast: bool) -> str:
+    """
+    Return a pdfplumber page's text.
+
+    With ``fast`` the text is read by ``extract_text_simple`` (chars joined
+    in stream order, no layout clustering), falling back to
+    ``extract_text`` when that comes back empty or with too few words.
+    """
+    if fast:
+        text = page.extract_text_simple() or ""
+        words = len(text.split())
+        if words and len(text) / words <= _FAST_TEXT_MAX_WORD_LEN:
+            return text
+    return page.extract_text() or ""
+
+
+def extract_table_range(
+    file_path: str, start: int, end: int, fast_text: bool = False
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Extract tables from pages ``[start, end)`` using pdfplumber.
+
+    - Clean / simple tables  → converted to GitHub-flavoured markdown.
+    - Lossy / complex tables → raw page text extracted via fitz is used
+      instead, so that multi-column spec tables (e.g. Samsung QLED with
+      3 model columns) are stored without data loss.
+
+    ``fast_text`` reads the page text used for the coverage check with
+    ``extract_text_simple`` (see _page_text).
+
+    Returns:
+        (table_texts, table_metadatas) — parallel lists ready for Qdrant.
+    """
+    texts: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+
+    with pdfplumber.open(file_path) as pdf, fitz.open(file_path) as fitz_doc:
+        for page_index in range(start, end):
+            page_num = page_index + 1
+            page = pdf.pages[page_index]
+            tables = page.extract_tables()
+            if not tables:
+                continue
+
+            # Full page text for coverage comparison
+            page_full_text = _page_text(page, fast_text)
+            # Only one raw-text fallback per page, however many tables are lossy
+            fallback_added = False
+
+            for table in tables:
+                # Skip rows that are entirely empty / None
+                non_empty_rows = [
+                    row for row in table if any(cell for cell in row if cell)
+                ]
+                if not non_empty_rows:
+                    continue
+
+                if is_table_lossy(non_empty_rows, page_full_text):
+                    # Complex multi-column layout — fall back to fitz raw text
+                    if not fallback_added:
+                        raw_text = fitz_doc[page_index].get_text("text").strip()
+                        if raw_text:
+                            texts.append(
+                                f"Specifications on page {page_num}:\n{raw_text}"
+                            )
+                            metadatas.append(
+                                {"source": "table_text", "page": page_num}
+                            )
+                            fallback_added = True
+                else:
+                    # Clean table — store as markdown
+                    markdown = table_to_markdown(non_empty_rows)
+                    texts.append(f"Table on page {page_num}:\n{markdown}")
+                    metadatas.append({"source": "table", "page": page_num})
+
+    return texts, metadatas
+
+
+def is_table_lossy(
+    rows: List[List],
+    page_full_text: str = "",
+    empty_threshold: float = 0.4,
+    coverage_threshold: float = 0.40,
+) -> bool:
+    """
+    Return True if the table appears to have lost data during parsing.
+
+    Two complementary checks:
+
+    1. **Empty-cell ratio** — if >*empty_threshold* of cells are blank,
+       pdfplumber likely failed on a merged-cell layout.
+
+    2. **Text-coverage ratio** — only applied to real multi-column data
+       tables (cols > 1 and rows > 3).  Compares the total characters
+       captured inside the table against the full page text. If the table
+       covers <*coverage_threshold* of the page text, columns were silently
+       dropped (e.g. a 3-column spec table parsed as 2 columns).
+    """
+    total_cells = sum(len(row) for row in rows)
+    if total_cells == 0:
+        return True
+
+    # Check 1: too many empty cells
+    empty = sum(
+        1 for row in rows for cell in row
+        if cell is None or not str(cell).strip()
+    )
+    if (empty / total_cells) > empty_threshold:
+        return True
+
+    # Check 2: coverage, but only for real multi-column data tables
+    # (skip small UI / navigation tables with 1 col or <= 3 rows)
+    num_cols = len(rows[0]) if rows else 0
+    num_rows = len(rows)
+    if page_full_text.strip() and num_cols > 1 and num_rows > 3:
+        table_text = " ".join(
+            str(cell) for row in rows for cell in row
+            if cell is not None and str(cell).strip()
+        )
+        coverage = len(table_text) / max(len(page_full_text), 1)
+        if coverage < coverage_threshold:
+            return True
+
+    return False
+
+
+def table_to_markdown(rows: List[List]) -> str:
+    """Convert a list of rows into a GitHub-flavoured markdown table."""
+    if not rows:
+        return ""
+
+    def cell(val) -> str:
+        return str(val).strip() if val is not None else ""
+
+    header = "| " + " | ".join(cell(c) for c in rows[0]) + " |"
+    divider = "| " + " | ".join("---" for _ in rows[0]) + " |"
+    body_rows = [
+        "| " + " | ".join(cell(c) for c in row) + " |"
+        for row in rows[1:]
+    ]
+    return "\n".join([header, divider] + body_rows)
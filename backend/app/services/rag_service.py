@@ -6,10 +6,11 @@ Backed by Qdrant Cloud vector store.
 from typing import List, Dict, Any, Optional
 import logging
 import asyncio
+import os
 import time
-from functools import partial
+from functools import lru_cache, partial
+from operator import itemgetter
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_qdrant import QdrantVectorStore
 from langchain_openai import ChatOpenAI
@@ -31,9 +32,48 @@ from qdrant_client.models import (
 )
 
 from app.core.config import settings
+from app.services.embedder_pool import EmbedderPool
+from app.services.tei_embeddings import create_tei_embeddings
+from app.services.text_splitting import BoundarySearchSplitter
 
 logger = logging.getLogger(__name__)
 
+# uuid5 namespace for deterministic Qdrant point ids (Qdrant needs UUIDs)
+_POINT_ID_NAMESPACE = uuid.UUID("52c8238f-93b2-4db9-9c10-5286e4720cdb")
+
+# Chunk metadata returned with each retrieved excerpt, with its defaults
+_META_DEFAULTS: Dict[str, Any] = {
+    "source_file": "Unknown",
+    "page_number": None,
+    "section_name": None,
+    "device_type": None,
+    "brand": None,
+    "model": None,
+}
+_META_FIELDS = itemgetter(*_META_DEFAULTS)
+
+# Header + body of one excerpt in the LLM context
+_EXCERPT_FMT = (
+    "[Excerpt {n} | Source: {source_file} | Page: {page_number} | "
+    "Section: {section} | Relevance: {relevance_score:.0%}]\n{content}"
+)
+
+
+def _embedding_model_kwargs() -> Dict[str, Any]:
+    """Pick the embedding device: CUDA with FP16 when available, else CPU FP32."""
+    import torch  # installed with sentence-transformers
+
+    device = settings.embedding_device
+    if device == "auto":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    kwargs: Dict[str, Any] = {"device": device}
+    if device.startswith("cuda"):
+        # Half precision runs the encoder on tensor cores; normalised
+        # MiniLM embeddings lose no meaningful retrieval quality.
+        kwargs["model_kwargs"] = {"torch_dtype": torch.float16}
+    return kwargs
+
 
 class RAGService:
     """Service for RAG-based document retrieval and question answering."""
@@ -46,13 +86,15 @@ class RAGService:
         self.llm = None
         self.groq_llm = None
         self.text_splitter = None
+        self.prompt_template = None
         self.initialized = False
         try:
             self._initialize()
             self.initialized = True
         except Exception as e:
             logger.error(
-                f"RAG service failed to initialise (auth/chat may still work): {e}"
+                "RAG service failed to initialise (auth/chat may still work): %s",
+                e,
             )
 
     # ------------------------------------------------------------------
@@ -62,16 +104,42 @@ class RAGService:
     def _initialize(self):
         """Initialize all components."""
         try:
-            # Embedding model
-            logger.info(f"Loading embedding model: {settings.embedding_model}")
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=settings.embedding_model,
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={"normalize_embeddings": True},
-            )
+            # Parsed once; generate_answer only formats it
+            self.prompt_template = self.create_prompt_template()
+
+            # Embedding model — remote TEI server if configured, else in-process
+            if settings.tei_url:
+                logger.info("Using TEI embeddings server: %s", settings.tei_url)
+                self.embeddings = create_tei_embeddings()
+            else:
+                model_kwargs = _embedding_model_kwargs()
+                logger.info(
+                    "Loading embedding model: %s on %s",
+                    settings.embedding_model, model_kwargs["device"],
+                )
+                load_model = partial(
+                    HuggingFaceEmbeddings,
+                    model_name=settings.embedding_model,
+                    model_kwargs=model_kwargs,
+                    encode_kwargs={
+                        "normalize_embeddings": True,
+                        "batch_size": settings.embedding_batch_size,
+                    },
+                )
+                pool_size = min(os.cpu_count() or 1, settings.max_embedders)
+                if pool_size > 1:
+                    # Split the cores between copies instead of every copy's
+                    # forward pass spawning a thread per core
+                    import torch
+
+                    torch.set_num_threads(max((os.cpu_count() or 1) // pool_size, 1))
+                    logger.info("Embedding with up to %s model copies", pool_size)
+                    self.embeddings = EmbedderPool(load_model, pool_size)
+                else:
+                    self.embeddings = load_model()
 
             # Text splitter
-            self.text_splitter = RecursiveCharacterTextSplitter(
+            self.text_splitter = BoundarySearchSplitter(
                 chunk_size=settings.chunk_size,
                 chunk_overlap=settings.chunk_overlap,
                 length_function=len,
@@ -81,7 +149,7 @@ class RAGService:
             # Qdrant Cloud client
             # timeout=120: the default (~5s) was too short — the upsert HTTP
             # request was being killed before Qdrant could respond.
-            logger.info(f"Connecting to Qdrant Cloud: {settings.qdrant_url}")
+            logger.info("Connecting to Qdrant Cloud: %s", settings.qdrant_url)
             self.qdrant_client = QdrantClient(
                 url=settings.qdrant_url,
                 api_key=settings.qdrant_api_key,
@@ -123,16 +191,16 @@ class RAGService:
                         temperature=settings.llm_temperature,
                         groq_api_key=settings.groq_api_key,
                     )
-                    logger.info(f"Groq LLM initialised with model: {settings.groq_model}")
+                    logger.info("Groq LLM initialised with model: %s", settings.groq_model)
                 except Exception as groq_err:
-                    logger.warning(f"Groq LLM failed to initialise: {groq_err}")
+                    logger.warning("Groq LLM failed to initialise: %s", groq_err)
             else:
                 logger.info("GROQ_API_KEY not set — Groq model unavailable")
 
             logger.info("RAG service initialised successfully with Qdrant Cloud")
 
         except Exception as e:
-            logger.error(f"Failed to initialise RAG service: {e}")
+            logger.error("Failed to initialise RAG service: %s", e)
             raise  # Re-raised so __init__ can catch and mark initialized=False
 
     def _ensure_collection(self):
@@ -141,7 +209,8 @@ class RAGService:
         collections = [c.name for c in self.qdrant_client.get_collections().collections]
         if settings.qdrant_collection_name not in collections:
             logger.info(
-                f"Creating Qdrant collection: {settings.qdrant_collection_name}"
+                "Creating Qdrant collection: %s",
+                settings.qdrant_collection_name,
             )
             self.qdrant_client.create_collection(
                 collection_name=settings.qdrant_collection_name,
@@ -152,7 +221,8 @@ class RAGService:
             )
         else:
             logger.info(
-                f"Qdrant collection '{settings.qdrant_collection_name}' already exists"
+                "Qdrant collection '%s' already exists",
+                settings.qdrant_collection_name,
             )
 
         # Ensure keyword indexes exist for all filterable metadata fields.
@@ -179,10 +249,10 @@ class RAGService:
                     field_name=field,
                     field_schema=PayloadSchemaType.KEYWORD,
                 )
-                logger.info(f"Payload index ensured for field: {field}")
+                logger.info("Payload index ensured for field: %s", field)
             except Exception as idx_err:
                 # Index may already exist with different schema — log and continue.
-                logger.warning(f"Could not create payload index for '{field}': {idx_err}")
+                logger.warning("Could not create payload index for '%s': %s", field, idx_err)
 
     # ------------------------------------------------------------------
     # Prompt template
@@ -213,6 +283,14 @@ class RAGService:
     # Retrieval
     # ------------------------------------------------------------------
 
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a user query without blocking the event loop.
+
+        TEI embeds natively async; the in-process model's aembed_query runs
+        the blocking encoder in the default executor.
+        """
+        return await self.embeddings.aembed_query(query)
+
     async def retrieve_relevant_chunks(
         self,
         query: str,
@@ -220,12 +298,16 @@ class RAGService:
         brand: Optional[str] = None,
         model: Optional[str] = None,
         top_k: int = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[Dict[str, Any]]:
         """Retrieve relevant document chunks for a query using Qdrant filters.
 
         Fetches 2x candidates then deduplicates by content similarity so the
         final top_k chunks are diverse — preventing 5 near-identical chunks
         from the same manual page from dominating the context window.
+
+        Pass ``query_embedding`` when the caller has already embedded the
+        query (e.g. for the answer cache) so it is not encoded twice.
         """
         if top_k is None:
             top_k = settings.retrieval_top_k
@@ -235,17 +317,25 @@ class RAGService:
 
         try:
             # Build Qdrant filter from optional metadata fields
-            qdrant_filter = self._build_filter(device_type=device_type, brand=brand, model=model)
+            qdrant_filter = self._build_filter(device_type, brand, model)
 
-            # Similarity search (run blocking call in executor)
+            if query_embedding is None:
+                query_embedding = await self.embed_query(query)
+
+            # Query Qdrant directly (run blocking call in executor): the
+            # LangChain wrapper would build a Document per hit only for us to
+            # unpack it again, and score_threshold drops weak hits server-side.
             loop = asyncio.get_running_loop()
-            results = await loop.run_in_executor(
+            response = await loop.run_in_executor(
                 None,
                 partial(
-                    self.vector_store.similarity_search_with_score,
-                    query,
-                    k=fetch_k,
-                    filter=qdrant_filter,
+                    self.qdrant_client.query_points,
+                    collection_name=settings.qdrant_collection_name,
+                    query=query_embedding,
+                    query_filter=qdrant_filter,
+                    limit=fetch_k,
+                    with_payload=True,
+                    score_threshold=settings.relevance_threshold,
                 ),
             )
 
@@ -257,13 +347,13 @@ class RAGService:
             seen_prefixes: list[str] = []
             chunks = []
 
-            for doc, score in results:
-                relevance_score = float(score)
-                if relevance_score < settings.relevance_threshold:
-                    continue
+            for point in response.points:
+                payload = point.payload or {}
+                content = payload.get("page_content") or ""
+                metadata = payload.get("metadata") or {}
 
                 # Use the first 150 chars as a near-duplicate fingerprint
-                prefix = doc.page_content[:150].lower().strip()
+                prefix = content[:150].lower().strip()
                 is_dup = any(
                     self._overlap_ratio(prefix, s) > 0.7
                     for s in seen_prefixes
@@ -272,29 +362,67 @@ class RAGService:
                     continue
 
                 seen_prefixes.append(prefix)
+                source_file, page_number, section_name, device_type, brand, model_name = (
+                    self._meta_fields(metadata)
+                )
                 chunks.append(
                     {
-                        "content": doc.page_content,
-                        "source_file": self._get_meta(doc.metadata, "source_file", "Unknown"),
-                        "page_number": self._get_meta(doc.metadata, "page_number"),
-                        "section_name": self._get_meta(doc.metadata, "section_name"),
-                        "relevance_score": round(relevance_score, 3),
-                        "device_type": self._get_meta(doc.metadata, "device_type"),
-                        "brand": self._get_meta(doc.metadata, "brand"),
-                        "model": self._get_meta(doc.metadata, "model"),
+                        "content": content,
+                        "source_file": source_file,
+                        "page_number": page_number,
+                        "section_name": section_name,
+                        "relevance_score": round(float(point.score), 3),
+                        "device_type": device_type,
+                        "brand": brand,
+                        "model": model_name,
                     }
                 )
 
                 if len(chunks) >= top_k:
                     break
 
-            logger.info(f"Retrieved {len(chunks)} diverse chunks for query: {query[:50]}...")
+            logger.info("Retrieved %s diverse chunks for query: %s...", len(chunks), query[:50])
             return chunks
 
         except Exception as e:
-            logger.error(f"Error retrieving chunks: {e}")
+            logger.error("Error retrieving chunks: %s", e)
             return []
 
+    async def retrieve_with_fallback(
+        self,
+        query: str,
+        device_type: Optional[str] = None,
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+        top_k: int = None,
+        query_embedding: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Retrieve chunks under the device filters, retrying without them
+        if nothing matches.
+
+        The query is embedded at most once and the vector is reused for the
+        retry, so the fallback costs one extra Qdrant search, not a second
+        pass through the embedding model.
+        """
+        if query_embedding is None:
+            query_embedding = await self.embed_query(query)
+
+        chunks = await self.retrieve_relevant_chunks(
+            query=query,
+            device_type=device_type,
+            brand=brand,
+            model=model,
+            top_k=top_k,
+            query_embedding=query_embedding,
+        )
+        if chunks or self._build_filter(device_type, brand, model) is None:
+            return chunks
+
+        logger.info("No chunks matched the device filters; retrying unfiltered")
+        return await self.retrieve_relevant_chunks(
+            query=query, top_k=top_k, query_embedding=query_embedding
+        )
+
     # ------------------------------------------------------------------
     # Title generation
     # ------------------------------------------------------------------
@@ -331,7 +459,7 @@ class RAGService:
             return title[:60] if title else first_message[:40]
 
         except Exception as e:
-            logger.warning(f"Title generation failed: {e}")
+            logger.warning("Title generation failed: %s", e)
             # Graceful fallback: first 40 chars of the message
             return first_message[:40].strip()
 
@@ -346,14 +474,21 @@ class RAGService:
         brand: Optional[str] = None,
         model: Optional[str] = None,
         ai_model: Optional[str] = "gemini",
+        query_embedding: Optional[List[float]] = None,
     ) -> Dict[str, Any]:
         """Generate an answer using RAG."""
+        retrieve = (
+            self.retrieve_with_fallback
+            if settings.retrieval_unfiltered_fallback
+            else self.retrieve_relevant_chunks
+        )
         try:
-            chunks = await self.retrieve_relevant_chunks(
+            chunks = await retrieve(
                 query=query,
                 device_type=device_type,
                 brand=brand,
                 model=model,
+                query_embedding=query_embedding,
             )
 
             if not chunks:
@@ -367,19 +502,12 @@ class RAGService:
 
             # Build context — include section name and relevance so the LLM
             # can see how well each chunk matches and prioritise accordingly.
-            context_parts = []
-            for i, chunk in enumerate(chunks, 1):
-                section = chunk.get("section_name") or "General"
-                context_parts.append(
-                    f"[Excerpt {i} | Source: {chunk['source_file']} | "
-                    f"Page: {chunk.get('page_number', 'N/A')} | "
-                    f"Section: {section} | Relevance: {chunk['relevance_score']:.0%}]\n"
-                    f"{chunk['content']}"
-                )
-            context = "\n\n---\n\n".join(context_parts)
+            context = "\n\n---\n\n".join([
+                _EXCERPT_FMT.format(n=i, section=chunk["section_name"] or "General", **chunk)
+                for i, chunk in enumerate(chunks, 1)
+            ])
 
-            prompt_template = self.create_prompt_template()
-            prompt = prompt_template.format(context=context, question=query)
+            prompt = self.prompt_template.format(context=context, question=query)
 
             # Select LLM based on ai_model param
             if ai_model == "groq" and self.groq_llm is not None:
@@ -409,7 +537,7 @@ class RAGService:
             return {"answer": answer, "sources": sources}
 
         except Exception as e:
-            logger.error(f"Error generating answer: {e}")
+            logger.error("Error generating answer: %s", e)
             raise
 
     # ------------------------------------------------------------------
@@ -420,56 +548,71 @@ class RAGService:
         self,
         texts: List[str],
         metadatas: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
         batch_size: int = 25,
         max_retries: int = 3,
         retry_delay: float = 5.0,
     ) -> int:
         """Add documents to the Qdrant vector store in small batches with retries.
 
-        Two-phase upload per batch:
-          1. Embed texts on CPU  (no Qdrant connection held open – no timeout risk)
-          2. Upsert pre-computed vectors to Qdrant  (fast network call)
+        Two-phase upload:
+          1. Embed a slab of texts on CPU in one call (no Qdrant connection
+             held open – no timeout risk); the encoder batches internally
+             by EMBEDDING_BATCH_SIZE, so large slabs keep it fully fed.
+          2. Upsert the pre-computed vectors to Qdrant `batch_size` points
+             at a time (fast network calls).
 
-        If the upsert step times out, it is retried up to `max_retries` times
+        If an upsert times out, it is retried up to `max_retries` times
         with a `retry_delay`-second pause.  Embeddings are cached so we never
         recompute them on a retry.
+
+        Pass deterministic ``ids`` (see chunk_point_id) to make the whole
+        call idempotent: upserting the same ids again overwrites points
+        instead of duplicating them.
         """
         # Safety net: ensure collection exists even if init failed earlier
         if self.qdrant_client is not None:
             try:
                 self._ensure_collection()
             except Exception as ec:
-                logger.warning(f"ensure_collection in add_documents failed: {ec}")
+                logger.warning("ensure_collection in add_documents failed: %s", ec)
 
         total = len(texts)
         added = 0
         loop = asyncio.get_running_loop()
 
+        slab_size = settings.indexing_embed_slab_size
+        embeddings_list: List[List[float]] = []
+
         for start in range(0, total, batch_size):
             end = min(start + batch_size, total)
             batch_texts = texts[start:end]
             batch_metas = metadatas[start:end]
             batch_num = start // batch_size + 1
 
-            # ── Step 1: Embed texts (CPU-bound; runs once per batch) ───────
-            logger.info(f"Embedding batch {batch_num} ({start}-{end-1} of {total})…")
-            embeddings_list: List[List[float]] = await loop.run_in_executor(
-                None,
-                partial(self.embeddings.embed_documents, batch_texts),
-            )
+            # ── Step 1: Embed the next slab once this batch runs past the
+            #    vectors computed so far (CPU-bound) ─────────────────────
+            if end > len(embeddings_list):
+                slab_start = len(embeddings_list)
+                slab_end = min(max(slab_start + slab_size, end), total)
+                logger.info("Embedding chunks %s-%s of %s…", slab_start, slab_end - 1, total)
+                embeddings_list.extend(
+                    await self.embeddings.aembed_documents(texts[slab_start:slab_end])
+                )
 
             # ── Step 2: Build PointStructs ─────────────────────────────
             points = [
                 PointStruct(
-                    id=str(uuid.uuid4()),
+                    id=point_id,
                     vector=embedding,
                     payload={
                         "page_content": text,
                         "metadata": meta,
                     },
                 )
-                for text, meta, embedding in zip(
-                    batch_texts, batch_metas, embeddings_list
+                for point_id, text, meta, embedding in zip(
+                    ids[start:end] if ids is not None else (str(uuid.uuid4()) for _ in batch_texts),
+                    batch_texts, batch_metas, embeddings_list[start:end],
                 )
             ]
 
@@ -487,9 +630,9 @@ class RAGService:
                     )
                     added += len(batch_texts)
                     logger.info(
-                        f"Batch {batch_num} uploaded ✓  "
-                        f"({added}/{total} chunks done)"
-                        + (f"  [attempt {attempt}]" if attempt > 1 else "")
+                        "Batch %s uploaded ✓  (%s/%s chunks done)%s",
+                        batch_num, added, total,
+                        f"  [attempt {attempt}]" if attempt > 1 else "",
                     )
                     last_error = None
                     break  # success — move to next batch
@@ -497,25 +640,66 @@ class RAGService:
                     last_error = e
                     if attempt < max_retries:
                         logger.warning(
-                            f"Batch {batch_num} attempt {attempt} failed: {e}. "
-                            f"Retrying in {retry_delay}s…"
+                            "Batch %s attempt %s failed: %s. Retrying in %ss…",
+                            batch_num, attempt, e, retry_delay,
                         )
                         await asyncio.sleep(retry_delay)
                     else:
                         logger.error(
-                            f"Batch {batch_num} failed after {max_retries} attempts: {e}"
+                            "Batch %s failed after %s attempts: %s",
+                            batch_num, max_retries, e,
                         )
 
             if last_error is not None:
                 raise last_error  # propagate only after all retries exhausted
 
-        logger.info(f"Successfully stored all {added} chunks in Qdrant")
+        logger.info("Successfully stored all %s chunks in Qdrant", added)
         return added
 
     # ------------------------------------------------------------------
     # Deletion
     # ------------------------------------------------------------------
 
+    @staticmethod
+    def chunk_point_id(document_id: str, version: int, chunk_index: int) -> str:
+        """Deterministic point id for one chunk of one indexing run."""
+        return str(uuid.uuid5(_POINT_ID_NAMESPACE, f"{document_id}:v{version}:{chunk_index}"))
+
+    def delete_document_version(self, document_id: str, version: int) -> bool:
+        """Delete the vectors written by one indexing run of a document."""
+        try:
+            self.qdrant_client.delete(
+                collection_name=settings.qdrant_collection_name,
+                points_selector=Filter(
+                    must=[
+                        self._document_filter(document_id),
+                        FieldCondition(key="metadata.version", match=MatchValue(value=version)),
+                    ]
+                ),
+            )
+            return True
+        except Exception as e:
+            logger.error("Error deleting document %s v%s: %s", document_id, version, e)
+            return False
+
+    def delete_stale_versions(self, document_id: str, current_version: int) -> bool:
+        """Delete a document's vectors from every run except ``current_version``
+        (including points indexed before versioning existed)."""
+        try:
+            self.qdrant_client.delete(
+                collection_name=settings.qdrant_collection_name,
+                points_selector=Filter(
+                    must=[self._document_filter(document_id)],
+                    must_not=[
+                        FieldCondition(key="metadata.version", match=MatchValue(value=current_version)),
+                    ],
+                ),
+            )
+            return True
+        except Exception as e:
+            logger.error("Error deleting stale vectors of document %s: %s", document_id, e)
+            return False
+
     def delete_document(self, document_id: str) -> bool:
         """Delete all vectors belonging to a document from Qdrant.
 
@@ -529,24 +713,13 @@ class RAGService:
                 self._ensure_collection()
             self.qdrant_client.delete(
                 collection_name=settings.qdrant_collection_name,
-                points_selector=Filter(
-                    should=[
-                        FieldCondition(
-                            key="document_id",
-                            match=MatchValue(value=document_id),
-                        ),
-                        FieldCondition(
-                            key="metadata.document_id",
-                            match=MatchValue(value=document_id),
-                        ),
-                    ]
-                ),
+                points_selector=self._document_filter(document_id),
             )
-            logger.info(f"Deleted document {document_id} from Qdrant")
+            logger.info("Deleted document %s from Qdrant", document_id)
             return True
 
         except Exception as e:
-            logger.error(f"Error deleting document {document_id}: {e}")
+            logger.error("Error deleting document %s: %s", document_id, e)
             return False
 
     # ------------------------------------------------------------------
@@ -567,6 +740,20 @@ class RAGService:
             return nested[key]
         return default
 
+    def _meta_fields(self, metadata: Dict[str, Any]) -> tuple:
+        """Return the _META_DEFAULTS fields of a chunk's metadata, in order.
+
+        Flat metadata (everything this service indexes) is read with one
+        itemgetter call; only the nested schema needs per-field _get_meta.
+        """
+        if isinstance(metadata.get("metadata"), dict):
+            return tuple(self._get_meta(metadata, key, default) for key, default in _META_DEFAULTS.items())
+        fields = _META_FIELDS({**_META_DEFAULTS, **metadata})
+        if fields[0] is None:
+            # _get_meta treats an explicit None like a missing key
+            fields = ("Unknown",) + fields[1:]
+        return fields
+
     @staticmethod
     def _overlap_ratio(a: str, b: str) -> float:
         """Estimate character-level overlap between two short strings."""
@@ -578,8 +765,19 @@ class RAGService:
             return 0.0
         return len(set_a & set_b) / len(set_a)
 
+    @staticmethod
+    def _document_filter(document_id: str) -> Filter:
+        """Match a document's points under either payload schema."""
+        return Filter(
+            should=[
+                FieldCondition(key="document_id", match=MatchValue(value=document_id)),
+                FieldCondition(key="metadata.document_id", match=MatchValue(value=document_id)),
+            ]
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=512)
     def _build_filter(
-        self,
         device_type: Optional[str],
         brand: Optional[str],
         model: Optional[str],
@@ -593,30 +791,18 @@ class RAGService:
         For each provided filter value we create a 'should' (OR) sub-filter that
         matches either schema, then wrap all sub-filters in a 'must' (AND) block
         so that multiple filters are applied together.
+
+        Memoised: the same few device/brand/model combinations recur on every
+        query, and the returned Filter is only ever serialised, never mutated.
         """
-        must_conditions = []
-
-        if device_type:
-            must_conditions.append(
-                Filter(should=[
-                    FieldCondition(key="device_type",          match=MatchValue(value=device_type)),
-                    FieldCondition(key="metadata.device_type", match=MatchValue(value=device_type)),
-                ])
-            )
-        if brand:
-            must_conditions.append(
-                Filter(should=[
-                    FieldCondition(key="brand",          match=MatchValue(value=brand)),
-                    FieldCondition(key="metadata.brand", match=MatchValue(value=brand)),
-                ])
-            )
-        if model:
-            must_conditions.append(
-                Filter(should=[
-                    FieldCondition(key="model",          match=MatchValue(value=model)),
-                    FieldCondition(key="metadata.model", match=MatchValue(value=model)),
-                ])
-            )
+        must_conditions = [
+            Filter(should=[
+                FieldCondition(key=key,               match=MatchValue(value=value)),
+                FieldCondition(key=f"metadata.{key}", match=MatchValue(value=value)),
+            ])
+            for key, value in (("device_type", device_type), ("brand", brand), ("model", model))
+            if value
+        ]
 
         return Filter(must=must_conditions) if must_conditions else None
 
@@ -0,0 +1,65 @@
+"""
+LangChain embeddings backed by a Text Embeddings Inference (TEI) server.
+
+Used instead of the in-process HuggingFace model when TEI_URL is set, so
+the API workers stop holding the model (and its PyTorch threads) and
+embedding scales independently of the web tier.
+"""
+
+from typing import List
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+# Keep-alive connections shared by every embed call
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+class TEIEmbeddings(Embeddings):
+    """Embed texts by POSTing to a TEI server's ``/embed`` endpoint."""
+
+    def __init__(self, base_url: str, batch_size: int = 32):
+        """
+        Args:
+            base_url: TEI server URL, e.g. http://tei:80
+            batch_size: Texts per request; must not exceed the server's
+                --max-client-batch-size
+        """
+        self.batch_size = batch_size
+        self._client = httpx.Client(base_url=base_url, http2=True, limits=_LIMITS, timeout=_TIMEOUT)
+        self._async_client = httpx.AsyncClient(base_url=base_url, http2=True, limits=_LIMITS, timeout=_TIMEOUT)
+
+    def _payload(self, texts: List[str]) -> dict:
+        return {"inputs": texts, "normalize": True, "truncate": True}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self._client.post("/embed", json=self._payload(texts[start:start + self.batch_size]))
+            response.raise_for_status()
+            vectors.extend(response.json())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            response = await self._async_client.post(
+                "/embed", json=self._payload(texts[start:start + self.batch_size])
+            )
+            response.raise_for_status()
+            vectors.extend(response.json())
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def create_tei_embeddings() -> TEIEmbeddings:
+    """Build the TEI client from settings."""
+    return TEIEmbeddings(settings.tei_url, batch_size=settings.tei_batch_size)
@@ -0,0 +1,112 @@
+"""
+Text splitter that places chunk boundaries by binary search.
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List
+import re
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_text_splitters.character import _split_text_with_regex
+
+
+class BoundarySearchSplitter(RecursiveCharacterTextSplitter):
+    """RecursiveCharacterTextSplitter with measure-once, bisected merging.
+
+    The parent measures every split with ``length_function`` when sorting
+    splits into mergeable and oversized, again while merging, and once more
+    for each split it drops from the front of a window to make the overlap.
+    Here each split is measured exactly once. Its lengths go into a prefix
+    sum, and both each chunk's end and the next chunk's overlap start are
+    found by bisecting that sum. With ``len`` that only saves some work. It
+    is what keeps a tokenizer-based length function affordable.
+
+    Same arguments and output as the parent; lengths are assumed additive
+    over splits, which the parent's running totals assume as well.
+
+    This overrides ``_split_text`` and reads the parent's private
+    attributes, so requirements.txt caps langchain-text-splitters below
+    the next minor release; tests/test_text_splitting.py checks the output
+    against the parent before the cap is raised.
+    """
+
+    def _split_text(self, text: str, separators: List[str]) -> List[str]:
+        # Separator choice and splitting as in RecursiveCharacterTextSplitter
+        separator = separators[-1]
+        new_separators: List[str] = []
+        for i, sep in enumerate(separators):
+            pattern = sep if self._is_separator_regex else re.escape(sep)
+            if not sep:
+                separator = sep
+                break
+            if re.search(pattern, text):
+                separator = sep
+                new_separators = separators[i + 1:]
+                break
+
+        pattern = separator if self._is_separator_regex else re.escape(separator)
+        splits = _split_text_with_regex(text, pattern, keep_separator=self._keep_separator)
+        merge_separator = "" if self._keep_separator else separator
+
+        final_chunks: List[str] = []
+        good_splits: List[str] = []
+        good_lengths: List[int] = []
+        for split in splits:
+            length = self._length_function(split)
+            if length < self._chunk_size:
+                good_splits.append(split)
+                good_lengths.append(length)
+                continue
+            if good_splits:
+                final_chunks.extend(self._merge_measured(good_splits, good_lengths, merge_separator))
+                good_splits, good_lengths = [], []
+            if not new_separators:
+                final_chunks.append(split)
+            else:
+                final_chunks.extend(self._split_text(split, new_separators))
+        if good_splits:
+            final_chunks.extend(self._merge_measured(good_splits, good_lengths, merge_separator))
+        return final_chunks
+
+    def _merge_measured(self, splits: List[str], lengths: List[int], separator: str) -> List[str]:
+        """Merge splits into chunks exactly like ``_merge_splits``.
+
+        ``lengths[i]`` is ``length_function(splits[i])``. With
+        ``prefix[k] = sum(lengths[:k]) + k * sep_len``, the window
+        ``splits[a:b]`` measures ``prefix[b] - prefix[a] - sep_len``.
+        """
+        sep_len = self._length_function(separator)
+        prefix = [0, *accumulate(length + sep_len for length in lengths)]
+        n = len(splits)
+
+        def window(a: int, b: int) -> int:
+            return prefix[b] - prefix[a] - sep_len if b > a else 0
+
+        docs: List[str] = []
+        start = 0
+        while True:
+            # Longest window from `start` that fits; the first split always
+            # joins, however long
+            end = bisect_right(prefix, prefix[start] + self._chunk_size + sep_len, start + 1, n + 1) - 1
+            end = max(end, start + 1)
+            doc = self._join_docs(splits[start:end], separator)
+            if doc is not None:
+                docs.append(doc)
+            if end == n:
+                return docs
+
+            # Next window: drop splits from the front until it is within
+            # the overlap and leaves room for splits[end]. The condition is
+            # monotone in the drop count, so bisect for the fewest drops.
+            lo, hi = start, end
+            while lo < hi:
+                mid = (lo + hi) // 2
+                kept = window(mid, end)
+                if kept <= self._chunk_overlap and (
+                    kept == 0 or kept + lengths[end] + sep_len <= self._chunk_size
+                ):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            start = lo
@@ -0,0 +1,96 @@
+"""
+backfill_user_ids.py
+────────────────────
+Deploy-time migration: fills the denormalised ``user_id`` field on
+conversations, messages, feedback and documents created before it existed.
+
+Owner-scoped endpoints and account deletion filter on ``user_id`` only, so
+records without it are invisible to their owners (and survive account
+deletion) until this script has run. It is a required deploy step, run
+before the API starts (see the deploy steps in README.md).
+
+Usage (from the backend/ directory, with the venv activated):
+
+    python scripts/backfill_user_ids.py
+
+The script expects MONGODB_URL and MONGODB_DB_NAME in .env. It is
+idempotent — only records still missing ``user_id`` are touched.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Make sure we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.core.config import settings
+
+BATCH_SIZE = 500
+
+
+async def _flush(collection, ops: list) -> int:
+    if not ops:
+        return 0
+    result = await collection.bulk_write(ops, ordered=False)
+    ops.clear()
+    return result.modified_count
+
+
+async def backfill_from_link(db, collection_name: str, link_field: str, parent_name: str) -> int:
+    """Copy ``user_id`` from the linked parent document (DBRef in link_field)."""
+    collection = db[collection_name]
+    parents = db[parent_name]
+    owner_of: dict = {}
+    ops: list = []
+    updated = 0
+
+    # {"user_id": None} matches both a missing field and an explicit null
+    async for doc in collection.find({"user_id": None}, {link_field: 1}):
+        ref = doc.get(link_field)
+        if ref is None:
+            continue
+        parent_id = ref.id
+        if parent_id not in owner_of:
+            parent = await parents.find_one({"_id": parent_id}, {"user_id": 1})
+            owner_of[parent_id] = parent.get("user_id") if parent else None
+        if owner_of[parent_id]:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"user_id": owner_of[parent_id]}}))
+        if len(ops) >= BATCH_SIZE:
+            updated += await _flush(collection, ops)
+
+    updated += await _flush(collection, ops)
+    return updated
+
+
+async def main():
+    print("=== Backfill denormalised user_id ===\n")
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    db = client[settings.mongodb_db_name]
+
+    try:
+        # Order matters: each step reads the user_id written by the previous one
+        steps = [
+            ("conversations", "user", "users"),
+            ("documents", "uploaded_by", "users"),
+            ("messages", "conversation", "conversations"),
+            ("feedback", "message", "messages"),
+        ]
+        for i, (collection_name, link_field, parent_name) in enumerate(steps, start=1):
+            print(f"[{i}/{len(steps)}] {collection_name} ← {parent_name}.user_id …")
+            updated = await backfill_from_link(db, collection_name, link_field, parent_name)
+            print(f"      Updated {updated} record(s)")
+    finally:
+        client.close()
+
+    print("\nDone.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+create_indexes.py
+─────────────────
+One-shot script: creates every MongoDB index the Beanie models declare,
+so the API can start with BEANIE_SKIP_INDEX_SYNC=true and skip index
+sync on each boot.
+
+The indexes come from the models themselves: the script runs Beanie's own
+index sync (init_beanie with skip_indexes=False) over the same model list
+the API uses, so Indexed fields and Settings.indexes never need copying
+here. The unique-index migration runs first, since the sync fails on an
+index still in its old non-unique form.
+
+Run it on first deployment and again whenever an index is added to
+app/models/database.py.
+
+Usage (from the backend/ directory, with the venv activated):
+
+    python scripts/create_indexes.py
+
+The script expects MONGODB_URL and MONGODB_DB_NAME in .env. It is
+idempotent — existing indexes with the same spec are left untouched, and
+none are dropped.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Make sure we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.core.database import DOCUMENT_MODELS
+from migrate_unique_indexes import migrate
+
+
+async def main() -> int:
+    print("=== Create MongoDB indexes ===\n")
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    db = client[settings.mongodb_db_name]
+
+    try:
+        if not await migrate(db):
+            print("\nResolve the duplicates above, then run this script again.")
+            return 1
+
+        await init_beanie(database=db, document_models=DOCUMENT_MODELS, skip_indexes=False)
+
+        for model in DOCUMENT_MODELS:
+            collection = model.get_pymongo_collection()
+            names = sorted(await collection.index_information())
+            print(f"  {collection.name}: {', '.join(names)}")
+    finally:
+        client.close()
+
+    print("\nDone.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
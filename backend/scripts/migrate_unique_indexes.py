@@ -0,0 +1,105 @@
+"""
+migrate_unique_indexes.py
+─────────────────────────
+Deploy-time migration: turns the old non-unique indexes on
+conversations.conversation_id, documents.document_id and
+device_categories.name into the unique indexes the models now declare.
+
+The models create these as ``<field>_1`` with unique=True. A database
+created before that already has a non-unique ``<field>_1``, and Beanie's
+index sync at startup would fail on the name/options conflict, so this
+must run before the API starts (see the deploy steps in README.md).
+
+For each index still non-unique the script first checks the collection
+for duplicate (or missing) values. If any exist it reports them, leaves
+the old index in place and exits non-zero, so the deploy stops instead of
+the app failing later. Otherwise it drops the index and recreates it as
+unique under the same name.
+
+Usage (from the backend/ directory, with the venv activated):
+
+    python scripts/migrate_unique_indexes.py
+
+The script expects MONGODB_URL and MONGODB_DB_NAME in .env. It is
+idempotent — once the indexes are unique it only lists them.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Make sure we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+
+from app.core.config import settings
+
+# (collection, field) pairs whose index became unique
+UNIQUE_FIELDS = [
+    ("conversations", "conversation_id"),
+    ("documents", "document_id"),
+    ("device_categories", "name"),
+]
+
+
+async def find_duplicates(collection, field: str, limit: int = 10) -> list:
+    """Return up to ``limit`` values of ``field`` held by more than one
+    document (a missing field counts as null, as in a unique index)."""
+    pipeline = [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=limit)
+
+
+async def migrate(db) -> bool:
+    """Make every UNIQUE_FIELDS index unique. Returns False if duplicates
+    block any of them."""
+    ok = True
+    for collection_name, field in UNIQUE_FIELDS:
+        collection = db[collection_name]
+        name = f"{field}_1"
+        existing = (await collection.index_information()).get(name)
+
+        if existing is not None and existing.get("unique"):
+            print(f"  {collection_name}.{name}: already unique")
+            continue
+
+        duplicates = await find_duplicates(collection, field)
+        if duplicates:
+            ok = False
+            print(f"  {collection_name}.{name}: NOT migrated, duplicate {field} values:")
+            for dup in duplicates:
+                print(f"      {dup['_id']!r} × {dup['count']}")
+            continue
+
+        if existing is not None:
+            await collection.drop_index(name)
+        await collection.create_index([(field, ASCENDING)], name=name, unique=True)
+        print(f"  {collection_name}.{name}: {'recreated' if existing else 'created'} as unique")
+    return ok
+
+
+async def main() -> int:
+    print("=== Migrate unique indexes ===\n")
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    try:
+        ok = await migrate(client[settings.mongodb_db_name])
+    finally:
+        client.close()
+
+    if not ok:
+        print("\nResolve the duplicates above, then run this script again.")
+        return 1
+    print("\nDone.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,10 @@
+"""
+Shared test setup.
+
+Settings are read from the environment at import time, so give the one
+required value a test default before any app module is imported.
+"""
+
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
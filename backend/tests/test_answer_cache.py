@@ -0,0 +1,105 @@
+"""
+AnswerCache keeps its per-scope embedding matrices in step with the
+exact-match cache through stores, evictions, expiry and invalidation.
+"""
+
+import numpy as np
+import pytest
+
+from app.services import answer_cache as answer_cache_module
+from app.services.answer_cache import AnswerCache, _ExactCache
+
+SCOPE = ("TV", "Samsung", None)
+OTHER_SCOPE = ("Refrigerator", "LG", None)
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer(monkeypatch):
+    timer = FakeTimer()
+
+    class TimedExactCache(_ExactCache):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, timer=timer, **kwargs)
+
+    monkeypatch.setattr(answer_cache_module, "_ExactCache", TimedExactCache)
+    return timer
+
+
+def _rows(cache):
+    return {bucket: sorted(matrix.keys) for bucket, matrix in cache._matrices.items()}
+
+
+def test_returns_the_closest_entry_in_scope():
+    cache = AnswerCache(maxsize=10, ttl=60, threshold=0.9)
+    cache.put("a", SCOPE, "gemini", {"answer": "a"}, _unit(1, 0, 0))
+    cache.put("b", SCOPE, "gemini", {"answer": "b"}, _unit(0, 1, 0))
+    cache.put("c", OTHER_SCOPE, "gemini", {"answer": "c"}, _unit(0.1, 1, 0))
+
+    assert cache.get_semantic(_unit(0.1, 1, 0), SCOPE, "gemini") == {"answer": "b"}
+    assert cache.get_semantic(_unit(1, 1, 0), SCOPE, "gemini") is None
+    assert cache.get_semantic(_unit(1, 0, 0), SCOPE, "groq") is None
+
+
+def test_matrix_grows_past_initial_capacity():
+    cache = AnswerCache(maxsize=100, ttl=60, threshold=0.99)
+    rng = np.random.default_rng(0)
+    vectors = [_unit(*rng.standard_normal(8)) for _ in range(40)]
+    for i, vector in enumerate(vectors):
+        cache.put(f"k{i}", SCOPE, "gemini", {"answer": i}, vector)
+
+    for i, vector in enumerate(vectors):
+        assert cache.get_semantic(vector, SCOPE, "gemini") == {"answer": i}
+
+
+def test_eviction_and_invalidation_drop_rows():
+    cache = AnswerCache(maxsize=3, ttl=60, threshold=0.9)
+    cache.put("a", SCOPE, "gemini", {"answer": "a"}, _unit(1, 0, 0))
+    cache.put("b", SCOPE, "gemini", {"answer": "b"}, _unit(0, 1, 0))
+    cache.put("c", OTHER_SCOPE, "gemini", {"answer": "c"}, _unit(0, 0, 1))
+    cache.put("d", SCOPE, "gemini", {"answer": "d"}, _unit(1, 1, 0))
+
+    # "a" was evicted to make room for "d"
+    assert _rows(cache) == {(SCOPE, "gemini"): ["b", "d"], (OTHER_SCOPE, "gemini"): ["c"]}
+    assert cache.get_semantic(_unit(1, 0, 0), SCOPE, "gemini") is None
+
+    cache.invalidate("Refrigerator", "LG")
+    assert _rows(cache) == {(SCOPE, "gemini"): ["b", "d"]}
+    assert cache.get_semantic(_unit(0, 0, 1), OTHER_SCOPE, "gemini") is None
+
+
+def test_expired_entries_leave_the_matrix(timer):
+    cache = AnswerCache(maxsize=10, ttl=60, threshold=0.9)
+    cache.put("old", SCOPE, "gemini", {"answer": "old"}, _unit(1, 0, 0))
+    timer.now = 30
+    cache.put("new", SCOPE, "gemini", {"answer": "new"}, _unit(0, 1, 0))
+
+    timer.now = 61
+    assert cache.get_semantic(_unit(1, 0, 0), SCOPE, "gemini") is None
+    assert cache.get_semantic(_unit(0, 1, 0), SCOPE, "gemini") == {"answer": "new"}
+    assert _rows(cache) == {(SCOPE, "gemini"): ["new"]}
+
+    timer.now = 91
+    assert cache.get_semantic(_unit(0, 1, 0), SCOPE, "gemini") is None
+    assert _rows(cache) == {}
+
+
+def test_storing_without_embedding_drops_the_old_row():
+    cache = AnswerCache(maxsize=10, ttl=60, threshold=0.9)
+    cache.put("a", SCOPE, "gemini", {"answer": "a"}, _unit(1, 0, 0))
+    cache.put("a", SCOPE, "gemini", {"answer": "a2"})
+
+    assert cache.get_exact("a") == {"answer": "a2"}
+    assert cache.get_semantic(_unit(1, 0, 0), SCOPE, "gemini") is None
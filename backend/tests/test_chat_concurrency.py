@@ -0,0 +1,39 @@
+"""
+chat's overlapped awaits cancel their siblings when one fails.
+"""
+
+import asyncio
+
+import pytest
+
+chat = pytest.importorskip("app.api.chat")
+
+
+def test_results_come_back_in_order():
+    async def value(v, delay):
+        await asyncio.sleep(delay)
+        return v
+
+    assert asyncio.run(chat._run_together(value("a", 0.02), value("b", 0))) == ["a", "b"]
+
+
+def test_failure_cancels_the_other_branch_and_raises_the_original_error():
+    cancelled = asyncio.Event()
+
+    async def slow_write():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing_rag():
+        await asyncio.sleep(0)
+        raise RuntimeError("LLM unavailable")
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="LLM unavailable"):
+            await chat._run_together(failing_rag(), slow_write())
+        assert cancelled.is_set()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
@@ -0,0 +1,28 @@
+"""
+Cursor validation on GET /conversation/{conversation_id}.
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+chat = pytest.importorskip("app.api.chat")
+
+from app.core.auth import get_current_active_user
+from app.models.database import UserAuthView
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_current_active_user] = lambda: UserAuthView(
+        _id="0123456789abcdef01234567", user_id="owner", email="owner@example.com", is_active=True
+    )
+    return TestClient(app)
+
+
+def test_before_id_without_before_is_rejected(client):
+    response = client.get("/conversation/c1", params={"before_id": "0123456789abcdef01234567"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["query", "before"]
@@ -0,0 +1,99 @@
+"""
+Content-hash deduplicated uploads through reindex and delete.
+"""
+
+import asyncio
+import io
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from beanie import init_beanie
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+
+from app.api import documents
+from app.core.config import settings
+from app.models.database import (
+    Conversation, DeviceCategory, DocumentStatus, Feedback, ManualDocument, Message, User, UserAuthView,
+)
+
+MANUAL = b"%PDF-1.4 the same manual, uploaded twice"
+
+
+class FakeRagService:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_document(self, document_id):
+        self.deleted.append(document_id)
+
+
+@pytest.fixture
+def rag(monkeypatch, tmp_path):
+    fake = FakeRagService()
+    monkeypatch.setitem(sys.modules, "app.services.rag_service", SimpleNamespace(rag_service=fake))
+    monkeypatch.setattr(documents, "settings", settings.model_copy(update={"upload_dir": str(tmp_path)}))
+
+    async def no_catalog(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(documents, "update_device_catalog", no_catalog)
+    return fake
+
+
+async def _setup():
+    client = mongomock_motor.AsyncMongoMockClient()
+    await init_beanie(
+        database=client["test"],
+        document_models=[User, Conversation, Message, Feedback, ManualDocument, DeviceCategory],
+    )
+    user = User(email="owner@example.com", hashed_password="x")
+    await user.insert()
+    return UserAuthView(_id=user.id, user_id=user.user_id, email=user.email, is_active=True)
+
+
+async def _upload(user, filename):
+    return await documents.upload_manual(
+        background_tasks=BackgroundTasks(),
+        file=UploadFile(io.BytesIO(MANUAL), filename=filename),
+        device_type="Refrigerator",
+        brand="Samsung",
+        model="RF28",
+        current_user=user,
+    )
+
+
+def test_duplicate_upload_reindex_then_delete(rag):
+    async def scenario():
+        user = await _setup()
+
+        first = await _upload(user, "first.pdf")
+        original = await ManualDocument.find_one(ManualDocument.document_id == first.document_id)
+        await original.set({ManualDocument.status: DocumentStatus.INDEXED, ManualDocument.chunks_count: 12})
+
+        second = await _upload(user, "second.pdf")
+        duplicate = await ManualDocument.find_one(ManualDocument.document_id == second.document_id)
+        assert duplicate.status == DocumentStatus.INDEXED
+        assert duplicate.vectors_document_id == original.document_id
+
+        # The duplicate has no vectors of its own to rebuild
+        with pytest.raises(HTTPException) as exc:
+            await documents.reindex_document(duplicate.document_id, current_user=user)
+        assert exc.value.status_code == 409
+        duplicate = await ManualDocument.find_one(ManualDocument.document_id == second.document_id)
+        assert duplicate.status == DocumentStatus.INDEXED
+        assert duplicate.chunks_count == 12
+
+        # Deleting the original keeps the vectors the duplicate still reads
+        await documents.delete_document(original.document_id, current_user=user)
+        assert rag.deleted == []
+
+        # Deleting the last user of the vectors removes them
+        await documents.delete_document(duplicate.document_id, current_user=user)
+        assert rag.deleted == [original.document_id]
+        assert await ManualDocument.find_all().count() == 0
+
+    asyncio.run(scenario())
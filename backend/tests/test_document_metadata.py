@@ -0,0 +1,52 @@
+"""
+Metadata heuristics in DocumentProcessor.extract_metadata_from_text.
+"""
+
+import pytest
+
+document_processor = pytest.importorskip("app.services.document_processor")
+
+
+def _baseline(text):
+    """The original lower()-and-substring loop the regexes replaced."""
+    metadata = {}
+    for line in text.split("\n")[:50]:
+        line_lower = line.lower()
+        if "model" in line_lower and len(line) < 100:
+            metadata["detected_model"] = line.strip()
+        if "troubleshooting" in line_lower:
+            metadata["section_type"] = "troubleshooting"
+        elif "installation" in line_lower:
+            metadata["section_type"] = "installation"
+        elif "user guide" in line_lower or "user manual" in line_lower:
+            metadata["section_type"] = "user_guide"
+    return metadata
+
+
+@pytest.fixture
+def extract():
+    return document_processor.DocumentProcessor().extract_metadata_from_text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Unicode case folding must not match (and used to raise KeyError)
+        "İNSTALLATION",
+        "TROUBLESHOOTİNG",
+        "Uſer Manual",
+        "Model QN90A\nİNSTALLATION GUIDE",
+        "Installation\nTROUBLESHOOTİNG",
+        "Uſer Manual for Model X",
+        # Plain ASCII keeps working, with last line and per-line priority
+        "User Guide\nInstallation and Troubleshooting",
+        "TROUBLESHOOTING\nuser manual",
+        "Model: " + "x" * 120 + "\nmodel RF28",
+    ],
+)
+def test_matches_baseline(extract, text):
+    assert extract(text) == _baseline(text)
+
+
+def test_unicode_lookalikes_are_not_sections(extract):
+    assert "section_type" not in extract("İNSTALLATION\nTROUBLESHOOTİNG\nUſer Manual")
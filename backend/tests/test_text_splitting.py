@@ -0,0 +1,95 @@
+"""
+BoundarySearchSplitter must match RecursiveCharacterTextSplitter exactly
+and scale linearly with the input.
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.text_splitting import BoundarySearchSplitter
+
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def _random_text(n_words: int, seed: int) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(n_words):
+        # Mostly short words, with the odd separator-free run longer than a chunk
+        length = rng.choice([rng.randint(1, 12)] * 50 + [rng.randint(150, 400)])
+        parts.append("".join(rng.choice("abcdefghij") for _ in range(length)))
+        parts.append(rng.choice([" "] * 6 + ["\n"] * 2 + ["\n\n", "  ", " \n"]))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize(
+    "chunk_size,chunk_overlap,keep_separator",
+    [(1000, 200, True), (100, 20, True), (100, 0, True), (50, 49, True), (120, 30, False), (80, 10, "end")],
+)
+def test_matches_recursive_splitter(seed, chunk_size, chunk_overlap, keep_separator):
+    text = _random_text(3000, seed)
+    kwargs = dict(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=SEPARATORS,
+        keep_separator=keep_separator,
+    )
+    expected = RecursiveCharacterTextSplitter(**kwargs).split_text(text)
+    assert BoundarySearchSplitter(**kwargs).split_text(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "   ", "short text", "x" * 2500, "a\n\n" * 700])
+def test_matches_recursive_splitter_edge_cases(text):
+    kwargs = dict(chunk_size=100, chunk_overlap=20, separators=SEPARATORS)
+    expected = RecursiveCharacterTextSplitter(**kwargs).split_text(text)
+    assert BoundarySearchSplitter(**kwargs).split_text(text) == expected
+
+
+def test_length_function_work_is_linear():
+    measured = 0
+
+    def counting_len(s: str) -> int:
+        nonlocal measured
+        measured += len(s)
+        return len(s)
+
+    splitter = BoundarySearchSplitter(
+        chunk_size=1000, chunk_overlap=200, length_function=counting_len, separators=SEPARATORS
+    )
+    for n_words in (20_000, 80_000):
+        measured = 0
+        text = _random_text(n_words, seed=1)
+        splitter.split_text(text)
+        # Each character is measured about once per separator level it
+        # passes through, independent of the input size
+        assert measured <= 3 * len(text)
+
+
+def test_length_function_calls_grow_linearly():
+    calls = 0
+
+    def counting_len(s: str) -> int:
+        nonlocal calls
+        calls += 1
+        return len(s)
+
+    splitter = BoundarySearchSplitter(
+        chunk_size=1000, chunk_overlap=200, length_function=counting_len, separators=SEPARATORS
+    )
+    text = _random_text(20_000, seed=2)
+
+    def count_calls(text: str) -> int:
+        nonlocal calls
+        calls = 0
+        splitter.split_text(text)
+        return calls
+
+    small, large = count_calls(text), count_calls("\n\n".join([text] * 4))
+    # 4x the input; quadratic behaviour would give ~16x
+    assert large <= 4.5 * small, (small, large)